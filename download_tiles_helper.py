@@ -2,7 +2,9 @@
 Помічник для завантаження зображень плиток маджонгу
 """
 
+import fnmatch
 import os
+import shutil
 import sys
 import urllib.request
 import zipfile
@@ -14,11 +16,37 @@ if sys.platform == 'win32':
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
+# Умовний імпорт urllib3 (пул з'єднань, без нього - urllib.request)
+try:
+    import urllib3
+    HAS_URLLIB3 = True
+except ImportError:
+    HAS_URLLIB3 = False
+    urllib3 = None
+
+# Розмір шматка для потокового завантаження та розпаковки (приблизно розмір L2 кешу)
+CHUNK_SIZE = 256 * 1024
+
+# Спільний пул keep-alive з'єднань: повторні завантаження з того самого хоста
+# не відкривають нове TCP/TLS з'єднання
+_http = urllib3.PoolManager(num_pools=4, maxsize=8) if HAS_URLLIB3 else None
+
 def download_file(url: str, dest_path: Path):
     """Завантажує файл з URL"""
     try:
         print(f"📥 Завантаження {url}...")
-        urllib.request.urlretrieve(url, dest_path)
+        if _http is not None:
+            response = _http.request("GET", url, preload_content=False)
+            try:
+                if response.status >= 400:
+                    raise urllib3.exceptions.HTTPError(f"HTTP {response.status}")
+                with open(dest_path, 'wb') as dst:
+                    shutil.copyfileobj(response, dst, length=CHUNK_SIZE)
+            finally:
+                response.release_conn()
+        else:
+            with urllib.request.urlopen(url) as response, open(dest_path, 'wb') as dst:
+                shutil.copyfileobj(response, dst, length=CHUNK_SIZE)
         print(f"✅ Завантажено: {dest_path}")
         return True
     except Exception as e:
@@ -29,8 +57,20 @@ def extract_zip(zip_path: Path, extract_to: Path):
     """Розпаковує ZIP архів"""
     try:
         print(f"📦 Розпаковка {zip_path}...")
+        extract_root = extract_to.resolve()
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_to)
+            # Розпаковуємо по одному файлу потоково, шматками по 256 КБ
+            for info in zip_ref.infolist():
+                if info.is_dir():
+                    continue
+                target = (extract_to / info.filename).resolve()
+                # Не даємо записати файл поза папкою розпаковки
+                if extract_root not in target.parents:
+                    print(f"⚠️  Пропущено небезпечний шлях: {info.filename}")
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with zip_ref.open(info) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, length=CHUNK_SIZE)
         print(f"✅ Розпаковано у {extract_to}")
         return True
     except Exception as e:
@@ -41,6 +81,9 @@ def main():
     """Головна функція"""
     tiles_dir = Path("assets/tiles")
     tiles_dir.mkdir(parents=True, exist_ok=True)
+    # Рядкові форми шляху обчислюємо один раз (absolute() викликає getcwd)
+    tiles_dir_str = str(tiles_dir)
+    tiles_dir_abs = str(tiles_dir.absolute())
     
     print("=" * 60)
     print("🀄 Завантаження зображень плиток маджонгу")
@@ -63,9 +106,9 @@ def main():
     
     print("📁 Після завантаження:")
     print(f"   - Розпакуй архів (якщо потрібно)")
-    print(f"   - Скопіюй PNG файли у папку: {tiles_dir.absolute()}")
+    print(f"   - Скопіюй PNG файли у папку: {tiles_dir_abs}")
     print(f"   - Переконайся, що назви файлів відповідають формату")
-    print(f"     (див. {tiles_dir}/README.md для деталей)")
+    print(f"     (див. {tiles_dir_str}/README.md для деталей)")
     print()
     
     print("🔍 Альтернатива: створи власні зображення")
@@ -73,14 +116,23 @@ def main():
     print("   Рекомендований розмір: 60x80 пікселів")
     print()
     
-    # Перевіряємо, чи є вже якісь файли
-    existing_files = list(tiles_dir.glob("*.png"))
-    if existing_files:
-        print(f"✅ Знайдено {len(existing_files)} зображень у папці")
-        for f in existing_files[:5]:  # Показуємо перші 5
-            print(f"   - {f.name}")
-        if len(existing_files) > 5:
-            print(f"   ... та ще {len(existing_files) - 5}")
+    # Перевіряємо, чи є вже якісь файли (один прохід scandir без створення Path)
+    existing_count = 0
+    first_names = []
+    with os.scandir(tiles_dir_str) as entries:
+        for entry in entries:
+            # Ті самі правила, що й у Path.glob("*.png"): регістр за правилами ОС,
+            # символьні посилання на файли враховуються
+            if fnmatch.fnmatch(entry.name, "*.png") and entry.is_file():
+                existing_count += 1
+                if len(first_names) < 5:  # Показуємо перші 5
+                    first_names.append(entry.name)
+    if existing_count:
+        print(f"✅ Знайдено {existing_count} зображень у папці")
+        for name in first_names:
+            print(f"   - {name}")
+        if existing_count > 5:
+            print(f"   ... та ще {existing_count - 5}")
     else:
         print("⚠️  Зображення не знайдено. Гра буде використовувати placeholder'и.")
     
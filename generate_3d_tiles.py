@@ -3,85 +3,292 @@
 Додає тіні, градієнти та об'ємний ефект
 """
 
-from PIL import Image, ImageDraw, ImageFilter, ImageEnhance
+from PIL import Image, ImageFilter, ImageEnhance
 from pathlib import Path
+from typing import Dict, FrozenSet, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import fnmatch
 import os
+import shutil
+import numpy as np
 
-def add_3d_effect(image_path: Path, output_path: Path):
-    """Додає 3D ефект до зображення тейлу"""
-    # Відкриваємо зображення
-    img = Image.open(image_path).convert("RGBA")
-    original_width, original_height = img.size
-    
-    # Створюємо нове зображення з додатковим простором для тіні
-    padding = 10
-    new_width = original_width + padding * 2
-    new_height = original_height + padding * 2
-    
-    # Створюємо базове зображення з прозорим фоном
-    result = Image.new("RGBA", (new_width, new_height), (0, 0, 0, 0))
-    
-    # Створюємо тінь
-    shadow = Image.new("RGBA", (new_width, new_height), (0, 0, 0, 0))
-    shadow_draw = ImageDraw.Draw(shadow)
-    
-    # Малюємо тінь (темна, зміщена вправо-вниз)
-    shadow_x = padding + 3
-    shadow_y = padding + 4
-    shadow_draw.ellipse(
-        [shadow_x, shadow_y, shadow_x + original_width, shadow_y + original_height],
-        fill=(0, 0, 0, 80)  # Напівпрозора чорна тінь
+# Умовний імпорт SciPy (швидше розмиття тіні, без нього - GaussianBlur з Pillow)
+try:
+    from scipy.ndimage import gaussian_filter1d
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+    gaussian_filter1d = None
+
+# Умовний імпорт Numba (JIT-ядро змішування, без нього - векторизований NumPy)
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    njit = None
+    prange = None
+
+# Відступ навколо тейлу під тінь
+PADDING = 10
+# Радіус розмиття тіні
+SHADOW_BLUR_RADIUS = 5
+# Рівень zlib для PNG: файли трохи більші, але кодування в рази швидше
+# (за замовчуванням Pillow використовує 6)
+PNG_COMPRESS_LEVEL = 1
+# Максимальна кількість пікселів у пачці тейлів одного розміру
+# (2 млн пікселів RGBA float32 = 32 МБ)
+BATCH_MAX_PIXELS = 2_000_000
+
+# Тінь, градієнт і підсвітлення країв залежать лише від розміру тейлу, тому
+# будуємо їх один раз для кожного (ширина, висота)
+_shadow_cache: Dict[Tuple[int, int], np.ndarray] = {}
+_gradient_cache: Dict[Tuple[int, int], np.ndarray] = {}
+_edge_cache: Dict[Tuple[int, int], np.ndarray] = {}
+
+
+def _alpha_over(dst: np.ndarray, src: np.ndarray):
+    """Накладає src на dst на місці (Porter-Duff "over", як Image.alpha_composite).
+    dst - float32 масив, src може мати менше вимірів і транслюється на dst"""
+    src = np.broadcast_to(src.astype(np.float32, copy=False), dst.shape)
+    if HAS_NUMBA:
+        if dst.ndim == 3:
+            dst, src = dst[None], src[None]
+        _alpha_over_kernel(dst, src)
+        return
+    src_a = src[..., 3:4] / np.float32(255)
+    dst_weight = dst[..., 3:4] / np.float32(255) * (1 - src_a)
+    out_a = src_a + dst_weight
+    # Повністю прозорі пікселі лишаються (0, 0, 0, 0)
+    out = np.zeros(dst.shape, dtype=np.float32)
+    np.divide(
+        src[..., :3] * src_a + dst[..., :3] * dst_weight,
+        out_a,
+        out=out[..., :3],
+        where=out_a > 0,
     )
+    out[..., 3:4] = out_a * 255
+    dst[...] = out
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _alpha_over_kernel(dst, src):
+        """Те саме змішування, що й у _alpha_over, попіксельно для (N, H, W, 4)"""
+        count, height, width, _ = dst.shape
+        for row in prange(count * height):
+            n = row // height
+            y = row % height
+            for x in range(width):
+                src_a = src[n, y, x, 3] / np.float32(255)
+                # Прозорий піксель src нічого не змінює
+                if src_a == 0:
+                    continue
+                dst_weight = dst[n, y, x, 3] / np.float32(255) * (1 - src_a)
+                out_a = src_a + dst_weight
+                for c in range(3):
+                    dst[n, y, x, c] = (src[n, y, x, c] * src_a + dst[n, y, x, c] * dst_weight) / out_a
+                dst[n, y, x, 3] = out_a * 255
+
+
+def _get_shadow(original_width: int, original_height: int) -> np.ndarray:
+    """Повертає розмиту тінь для тейлу заданого розміру (кешується за розміром)"""
+    key = (original_width, original_height)
+    cached = _shadow_cache.get(key)
+    if cached is not None:
+        return cached
     
-    # Розмиваємо тінь
-    shadow = shadow.filter(ImageFilter.GaussianBlur(radius=5))
-    
-    # Додаємо тінь до результату
-    result = Image.alpha_composite(result, shadow)
-    
-    # Створюємо градієнтний overlay для об'ємного вигляду
-    gradient = Image.new("RGBA", (original_width, original_height), (0, 0, 0, 0))
-    gradient_draw = ImageDraw.Draw(gradient)
-    
-    # Створюємо лінійний градієнт (світліший зверху, темніший знизу)
-    for y in range(original_height):
-        # Обчислюємо прозорість градієнта
-        alpha = int(30 * (1 - y / original_height))  # Від 30 до 0
-        if alpha > 0:
-            # Верхня частина - світліша
-            if y < original_height // 2:
-                color = (255, 255, 255, alpha)
-            # Нижня частина - темніша
-            else:
-                color = (0, 0, 0, alpha // 2)
-            
-            gradient_draw.line([(0, y), (original_width, y)], fill=color)
-    
-    # Застосовуємо градієнт до оригінального зображення
-    img_with_gradient = Image.alpha_composite(img, gradient)
+    # Створюємо тінь з додатковим простором навколо тейлу.
+    # Тінь чорна, тож малюємо і розмиваємо лише її alpha-канал (1 байт на піксель)
+    new_width = original_width + PADDING * 2
+    new_height = original_height + PADDING * 2
     
-    # Додаємо об'ємний ефект через підсвітлення країв
-    # Верхній край - світліший
-    edge_overlay = Image.new("RGBA", (original_width, original_height), (0, 0, 0, 0))
-    edge_draw = ImageDraw.Draw(edge_overlay)
+    # Малюємо тінь (темна, зміщена вправо-вниз): еліпс через неявне рівняння.
+    # Рамка еліпса включає обидві межі (як у ImageDraw), тому піввісі більші на 0.5
+    shadow_x = PADDING + 3
+    shadow_y = PADDING + 4
+    yy, xx = np.ogrid[:new_height, :new_width]
+    center_x = shadow_x + original_width / 2
+    center_y = shadow_y + original_height / 2
+    radius_x = original_width / 2 + 0.5
+    radius_y = original_height / 2 + 0.5
+    inside = ((xx - center_x) / radius_x) ** 2 + ((yy - center_y) / radius_y) ** 2 <= 1
+    shadow_alpha = np.where(inside, np.uint8(80), np.uint8(0))  # Напівпрозора чорна тінь
     
-    # Верхній край
-    edge_draw.rectangle([0, 0, original_width, 3], fill=(255, 255, 255, 40))
+    # Розмиваємо тінь і збираємо RGBA з чорних каналів кольору
+    cached = np.zeros((new_height, new_width, 4), dtype=np.uint8)
+    if HAS_SCIPY:
+        # Два 1-D проходи сепарабельного гаусового фільтра (sigma = radius у PIL)
+        blurred = shadow_alpha.astype(np.float32)
+        blurred = gaussian_filter1d(blurred, sigma=SHADOW_BLUR_RADIUS, axis=0, mode="constant")
+        blurred = gaussian_filter1d(blurred, sigma=SHADOW_BLUR_RADIUS, axis=1, mode="constant")
+        cached[..., 3] = np.clip(np.rint(blurred), 0, 255)
+    else:
+        blurred = Image.fromarray(shadow_alpha, "L").filter(ImageFilter.GaussianBlur(radius=SHADOW_BLUR_RADIUS))
+        cached[..., 3] = np.asarray(blurred)
+    cached.setflags(write=False)
+    _shadow_cache[key] = cached
+    return cached
+
+
+def _get_gradient(original_width: int, original_height: int) -> np.ndarray:
+    """Повертає градієнтний overlay (float32) для тейлу заданого розміру (кешується за розміром)"""
+    key = (original_width, original_height)
+    cached = _gradient_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    # Лінійний градієнт (світліший зверху, темніший знизу) будуємо одним масивом
+    y = np.arange(original_height)
+    alpha = (30 * (1 - y / original_height)).astype(np.uint8)  # Від 30 до 0
+    half = original_height // 2
+    gradient = np.zeros((original_height, original_width, 4), dtype=np.uint8)
+    # Верхня частина - світліша
+    gradient[:half, :, :3] = 255
+    gradient[:half, :, 3] = alpha[:half, None]
+    # Нижня частина - темніша
+    gradient[half:, :, 3] = alpha[half:, None] // 2
+    
+    # Зберігаємо одразу у float32, щоб не конвертувати при кожному змішуванні
+    cached = gradient.astype(np.float32)
+    cached.setflags(write=False)
+    _gradient_cache[key] = cached
+    return cached
+
+
+def _get_edge_overlay(original_width: int, original_height: int) -> np.ndarray:
+    """Повертає overlay підсвітлення країв для тейлу заданого розміру (кешується за розміром)"""
+    key = (original_width, original_height)
+    cached = _edge_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    # Прямокутники ImageDraw включали обидві межі, тому світлі краї мають
+    # ширину 4 пікселі, а темні - 3; пізніші краї перекривають попередні
+    cached = np.zeros((original_height, original_width, 4), dtype=np.uint8)
+    # Верхній край - світліший
+    cached[:4, :] = (255, 255, 255, 40)
     # Лівий край
-    edge_draw.rectangle([0, 0, 3, original_height], fill=(255, 255, 255, 40))
+    cached[:, :4] = (255, 255, 255, 40)
     # Нижній край - темніший
-    edge_draw.rectangle([0, original_height - 3, original_width, original_height], fill=(0, 0, 0, 30))
+    cached[-3:, :] = (0, 0, 0, 30)
     # Правий край - темніший
-    edge_draw.rectangle([original_width - 3, 0, original_width, original_height], fill=(0, 0, 0, 30))
+    cached[:, -3:] = (0, 0, 0, 30)
+    
+    cached.setflags(write=False)
+    _edge_cache[key] = cached
+    return cached
+
+
+def _load_tile(image_path: Path) -> np.ndarray:
+    """Декодує тейл у масив float32 (H, W, 4)"""
+    # Декодуємо зображення один раз одразу в масив і далі працюємо лише з NumPy;
+    # convert() викликаємо тільки якщо тейл ще не RGBA (інакше це зайва копія)
+    with Image.open(image_path) as img:
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
+        return np.asarray(img, dtype=np.float32)
+
+
+def _save_tile(result: np.ndarray, output_path: Path):
+    """Зберігає готовий тейл (uint8 RGBA) у PNG"""
+    Image.fromarray(result, "RGBA").save(
+        output_path, "PNG", compress_level=PNG_COMPRESS_LEVEL, optimize=False
+    )
+
+
+def _apply_3d_effect(tiles: np.ndarray) -> np.ndarray:
+    """Додає 3D ефект до пачки тейлів одного розміру (N, H, W, 4) і повертає uint8 масив з тінню"""
+    original_height, original_width = tiles.shape[1:3]
+    
+    # Тінь на прозорому фоні (з додатковим простором) і є базою результату.
+    # Полотно одразу uint8: поза тейлом це просто копія тіні без перерахунку
+    shadow = _get_shadow(original_width, original_height)
+    result = np.repeat(shadow[None], len(tiles), axis=0)
     
-    img_final = Image.alpha_composite(img_with_gradient, edge_overlay)
+    # Градієнтний overlay для об'ємного вигляду
+    gradient = _get_gradient(original_width, original_height)
     
-    # Вставляємо оброблене зображення в результат (з відступом для тіні)
-    result.paste(img_final, (padding, padding), img_final)
+    # Застосовуємо градієнт до оригінальних зображень. Нижні рядки градієнта
+    # повністю прозорі, тож змішуємо лише рядки до останнього непрозорого
+    visible_rows = np.flatnonzero(gradient[:, 0, 3])
+    if visible_rows.size:
+        blend_rows = int(visible_rows[-1]) + 1
+        _alpha_over(tiles[:, :blend_rows], gradient[:blend_rows])
     
-    # Зберігаємо результат
-    result.save(output_path, "PNG")
-    print(f"✓ Оброблено: {image_path.name} -> {output_path.name}")
+    # Додаємо об'ємний ефект через підсвітлення країв
+    _alpha_over(tiles, _get_edge_overlay(original_width, original_height))
+    
+    # Вставляємо оброблені зображення на тінь (з відступом для тіні);
+    # як і paste з маскою, змішуємо всі чотири канали за alpha тейлу
+    # Рахуємо у float32 лише область тейлу, а не все полотно
+    shadow_region = shadow[PADDING:PADDING + original_height, PADDING:PADDING + original_width]
+    shadow_region = shadow_region.astype(np.float32)
+    weight = tiles[..., 3:4] / np.float32(255)
+    tiles -= shadow_region
+    tiles *= weight
+    tiles += shadow_region
+    np.rint(tiles, out=tiles)
+    np.clip(tiles, 0, 255, out=tiles)
+    result[:, PADDING:PADDING + original_height, PADDING:PADDING + original_width] = tiles
+    
+    return result
+
+
+def add_3d_effect(image_path: Path, output_path: Path):
+    """Додає 3D ефект до зображення тейлу"""
+    tile = _load_tile(image_path)
+    _save_tile(_apply_3d_effect(tile[None])[0], output_path)
+
+
+def _process_batch(
+    img_paths: List[Path], backup_dir: Path, output_dir: Path, existing_backups: FrozenSet[str]
+) -> List[str]:
+    """Обробляє частину тейлів у процесі-воркері та повертає повідомлення для виводу.
+    Тейли одного розміру складаються в один 4-D масив і обробляються разом"""
+    messages: List[str] = []
+    # Тейли, згруповані за розміром: (H, W) -> [(шлях, масив)]
+    pending: Dict[Tuple[int, int], List[Tuple[Path, np.ndarray]]] = {}
+    
+    def flush(size: Tuple[int, int]):
+        group = pending.pop(size)
+        try:
+            results = _apply_3d_effect(np.stack([tile for _, tile in group]))
+        except Exception as e:
+            for img_path, _ in group:
+                messages.append(f"❌ Помилка при обробці {img_path.name}: {e}")
+            return
+        for (img_path, _), result in zip(group, results):
+            output_path = output_dir / img_path.name
+            try:
+                _save_tile(result, output_path)
+                messages.append(f"✓ Оброблено: {img_path.name} -> {output_path.name}")
+            except Exception as e:
+                messages.append(f"❌ Помилка при обробці {img_path.name}: {e}")
+    
+    for img_path in img_paths:
+        # Створюємо backup оригіналу
+        backup_path = backup_dir / img_path.name
+        if img_path.name not in existing_backups:
+            shutil.copy2(img_path, backup_path)
+            messages.append(f"💾 Створено backup: {backup_path.name}")
+        
+        try:
+            tile = _load_tile(img_path)
+        except Exception as e:
+            messages.append(f"❌ Помилка при обробці {img_path.name}: {e}")
+            continue
+        size = tile.shape[:2]
+        group = pending.setdefault(size, [])
+        group.append((img_path, tile))
+        # Обмежуємо пам'ять пачки, щоб великі тейли не займали сотні МБ
+        if len(group) * size[0] * size[1] >= BATCH_MAX_PIXELS:
+            flush(size)
+    
+    for size in list(pending):
+        flush(size)
+    return messages
 
 
 def process_all_tiles():
@@ -105,8 +312,15 @@ def process_all_tiles():
     backup_dir.mkdir(exist_ok=True)
     output_dir.mkdir(exist_ok=True)
     
-    # Знаходимо всі PNG файли
-    png_files = list(tiles_dir.glob("*.png"))
+    # Знаходимо всі PNG файли (scandir не заходить у підпапки і кешує stat)
+    with os.scandir(tiles_dir) as entries:
+        png_files = [
+            Path(entry.path)
+            for entry in entries
+            # Ті самі правила, що й у Path.glob("*.png"): регістр за правилами ОС,
+            # символьні посилання на файли враховуються
+            if fnmatch.fnmatch(entry.name, "*.png") and entry.is_file()
+        ]
     
     if not png_files:
         print(f"❌ Не знайдено PNG файлів в {tiles_dir}")
@@ -114,25 +328,24 @@ def process_all_tiles():
     
     print(f"📦 Знайдено {len(png_files)} файлів для обробки\n")
     
-    # Обробляємо кожен файл
-    for img_path in png_files:
-        # Пропускаємо файли в підпапках
-        if img_path.parent != tiles_dir:
-            continue
-        
-        # Створюємо backup оригіналу
-        backup_path = backup_dir / img_path.name
-        if not backup_path.exists():
-            import shutil
-            shutil.copy2(img_path, backup_path)
-            print(f"💾 Створено backup: {backup_path.name}")
-        
-        # Генеруємо 3D версію
-        output_path = output_dir / img_path.name
-        try:
-            add_3d_effect(img_path, output_path)
-        except Exception as e:
-            print(f"❌ Помилка при обробці {img_path.name}: {e}")
+    # Наявні backup'и читаємо один раз, а не робимо stat для кожного файлу
+    with os.scandir(backup_dir) as entries:
+        existing_backups = frozenset(entry.name for entry in entries)
+    
+    # Обробляємо файли паралельно: кожен воркер отримує свою частину тейлів
+    workers = os.cpu_count() or 1
+    chunk_size = -(-len(png_files) // workers)
+    chunks = [png_files[i:i + chunk_size] for i in range(0, len(png_files), chunk_size)]
+    worker = partial(
+        _process_batch,
+        backup_dir=backup_dir,
+        output_dir=output_dir,
+        existing_backups=existing_backups,
+    )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for messages in executor.map(worker, chunks):
+            for message in messages:
+                print(message)
     
     print(f"\n✅ Готово! 3D тейли збережено в {output_dir}")
     print(f"💡 Оригінали збережено в {backup_dir}")
@@ -146,8 +359,8 @@ if __name__ == "__main__":
     try:
         process_all_tiles()
     except ImportError:
-        print("❌ Помилка: не встановлено бібліотеку Pillow")
-        print("💡 Встановіть: pip install Pillow")
+        print("❌ Помилка: не встановлено бібліотеки Pillow та NumPy")
+        print("💡 Встановіть: pip install Pillow numpy")
     except Exception as e:
         print(f"❌ Помилка: {e}")
 
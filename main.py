@@ -7,6 +7,8 @@ import pygame
 import random
 import math
 import os
+import numpy as np
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Tuple, Optional, Set, Dict
 from enum import Enum
@@ -22,6 +24,9 @@ TILE_HEIGHT = 70
 TILE_DEPTH = 15  # Висота для 3D ефекту
 TILE_SPACING_X = 52  # Відстань між плитками по X
 TILE_SPACING_Y = 55  # Відстань між плитками по Y
+TEXT_CACHE_SIZE = 256  # Максимум відрендерених рядків у кеші
+FPS = 30  # Дошка статична між кліками, 30 кадрів достатньо
+PATTERN_WIDTH = 18  # Ширина сітки патерну (клітинок)
 
 # Кольори
 BACKGROUND_COLOR = (20, 80, 20)  # Темно-зелений
@@ -92,52 +97,184 @@ class TileType(Enum):
     SEASON_WINTER = "season_winter"
 
 
+# Короткі назви плиток для відображення (fallback без зображень)
+_DISPLAY_NAMES: Dict[TileType, str] = {
+    TileType.BAMBOO_1: "1B", TileType.BAMBOO_2: "2B", TileType.BAMBOO_3: "3B",
+    TileType.BAMBOO_4: "4B", TileType.BAMBOO_5: "5B", TileType.BAMBOO_6: "6B",
+    TileType.BAMBOO_7: "7B", TileType.BAMBOO_8: "8B", TileType.BAMBOO_9: "9B",
+    TileType.DOT_1: "1D", TileType.DOT_2: "2D", TileType.DOT_3: "3D",
+    TileType.DOT_4: "4D", TileType.DOT_5: "5D", TileType.DOT_6: "6D",
+    TileType.DOT_7: "7D", TileType.DOT_8: "8D", TileType.DOT_9: "9D",
+    TileType.WAN_1: "1W", TileType.WAN_2: "2W", TileType.WAN_3: "3W",
+    TileType.WAN_4: "4W", TileType.WAN_5: "5W", TileType.WAN_6: "6W",
+    TileType.WAN_7: "7W", TileType.WAN_8: "8W", TileType.WAN_9: "9W",
+    TileType.EAST: "東", TileType.SOUTH: "南", TileType.WEST: "西", TileType.NORTH: "北",
+    TileType.RED_DRAGON: "中", TileType.GREEN_DRAGON: "發", TileType.WHITE_DRAGON: "白",
+    TileType.FLOWER_PLUM: "梅", TileType.FLOWER_ORCHID: "蘭", 
+    TileType.FLOWER_CHRYSANTHEMUM: "菊", TileType.FLOWER_BAMBOO: "竹",
+    TileType.SEASON_SPRING: "春", TileType.SEASON_SUMMER: "夏",
+    TileType.SEASON_AUTUMN: "秋", TileType.SEASON_WINTER: "冬",
+}
+
+# Компактні цілі ідентифікатори типів для масивів дошки
+TYPE_TO_ID: Dict[TileType, int] = {t: i for i, t in enumerate(TileType)}
+
+
 class Tile:
     """Клас для представлення однієї плитки"""
     
+    __slots__ = ('tile_type', 'type_id', 'x', 'y', 'z', 'selected', 'removed',
+                 'index', 'screen_x', 'screen_y')
+    
     def __init__(self, tile_type: TileType, x: int, y: int, z: int = 0):
         self.tile_type = tile_type
+        self.type_id = TYPE_TO_ID[tile_type]  # Ціле число для швидкого порівняння типів
         self.x = x  # Позиція на дошці
         self.y = y
         self.z = z  # Шар (для 3D ефекту)
         self.selected = False
         self.removed = False
+        self.index = -1  # Індекс у масивах дошки
+        self.screen_x = 0  # Позиція на екрані (заповнюється дошкою)
+        self.screen_y = 0
         
-    def __eq__(self, other):
-        """Дві плитки рівні, якщо вони одного типу"""
-        if not isinstance(other, Tile):
-            return False
-        return self.tile_type == other.tile_type
-    
     def get_display_name(self) -> str:
         """Повертає назву для відображення"""
-        name_map = {
-            TileType.BAMBOO_1: "1B", TileType.BAMBOO_2: "2B", TileType.BAMBOO_3: "3B",
-            TileType.BAMBOO_4: "4B", TileType.BAMBOO_5: "5B", TileType.BAMBOO_6: "6B",
-            TileType.BAMBOO_7: "7B", TileType.BAMBOO_8: "8B", TileType.BAMBOO_9: "9B",
-            TileType.DOT_1: "1D", TileType.DOT_2: "2D", TileType.DOT_3: "3D",
-            TileType.DOT_4: "4D", TileType.DOT_5: "5D", TileType.DOT_6: "6D",
-            TileType.DOT_7: "7D", TileType.DOT_8: "8D", TileType.DOT_9: "9D",
-            TileType.WAN_1: "1W", TileType.WAN_2: "2W", TileType.WAN_3: "3W",
-            TileType.WAN_4: "4W", TileType.WAN_5: "5W", TileType.WAN_6: "6W",
-            TileType.WAN_7: "7W", TileType.WAN_8: "8W", TileType.WAN_9: "9W",
-            TileType.EAST: "東", TileType.SOUTH: "南", TileType.WEST: "西", TileType.NORTH: "北",
-            TileType.RED_DRAGON: "中", TileType.GREEN_DRAGON: "發", TileType.WHITE_DRAGON: "白",
-            TileType.FLOWER_PLUM: "梅", TileType.FLOWER_ORCHID: "蘭", 
-            TileType.FLOWER_CHRYSANTHEMUM: "菊", TileType.FLOWER_BAMBOO: "竹",
-            TileType.SEASON_SPRING: "春", TileType.SEASON_SUMMER: "夏",
-            TileType.SEASON_AUTUMN: "秋", TileType.SEASON_WINTER: "冬",
-        }
-        return name_map.get(self.tile_type, "?")
+        return _DISPLAY_NAMES.get(self.tile_type, "?")
+
+
+def _rows_to_mask(rows: Tuple[str, ...]) -> int:
+    """Пакує рядки шару в бітову маску: біт y * PATTERN_WIDTH + x"""
+    mask = 0
+    for y, row in enumerate(rows):
+        for x, cell in enumerate(row):
+            if cell == "#":
+                mask |= 1 << (y * PATTERN_WIDTH + x)
+    return mask
+
+
+def _create_pyramid_pattern() -> List[int]:
+    """Створює класичний патерн Turtle для Mahjong Solitaire"""
+    # Класичний патерн Turtle - найпопулярніший патерн
+    # Кожен шар задається рядками ('#' - є плитка) і пакується в одну бітову маску
+    
+    # Шар 0 (нижній) - 144 плитки
+    layer0 = (
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        "....##########....",
+        "...############...",
+        "..##############..",
+        ".################.",
+        "##################",
+        "##################",
+        ".################.",
+        "..##############..",
+        "...############...",
+        "....##########....",
+        "..................",
+        "..................",
+    )
+    
+    # Шар 1 - 100 плиток
+    layer1 = (
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        ".....########.....",
+        "....##########....",
+        "...############...",
+        "..##############..",
+        "..##############..",
+        "...############...",
+        "....##########....",
+        ".....########.....",
+        "..................",
+        "..................",
+        "..................",
+    )
+    
+    # Шар 2 - 64 плитки
+    layer2 = (
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        "......######......",
+        ".....########.....",
+        "....##########....",
+        "....##########....",
+        ".....########.....",
+        "......######......",
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+    )
+    
+    # Шар 3 (верхній) - 36 плиток
+    layer3 = (
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        ".......####.......",
+        "......######......",
+        "......######......",
+        ".......####.......",
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+        "..................",
+    )
+    
+    return [_rows_to_mask(layer) for layer in (layer0, layer1, layer2, layer3)]
 
 
 class Board:
     """Клас для представлення дошки з плитками"""
     
+    # Патерн обчислюється один раз при визначенні класу, а не для кожної дошки
+    _PATTERN: List[int] = _create_pyramid_pattern()
+    
     def __init__(self):
         self.tiles: List[Tile] = []
         self.selected_tile: Optional[Tile] = None
         self.generate_board()
+        # Порядок перевірки кліків (верхні шари першими); координати плиток не змінюються
+        self.hit_order: List[Tile] = sorted(self.tiles, key=lambda t: (-t.z, t.y, t.x))
+        # Порядок малювання (нижні шари першими)
+        self.draw_order: List[Tile] = sorted(self.tiles, key=lambda t: (t.z, t.y, t.x))
+        # Лише живі плитки у порядку малювання; видалені прибираються в _remove_tile
+        self.live_draw_order: List[Tile] = list(self.draw_order)
+        # Сітка кошиків розміром з плитку: клітинка -> плитки, що її перекривають
+        self.bucket: Dict[Tuple[int, int], List[Tile]] = {}
+        self._build_buckets()
+        # Просторовий індекс живих плиток для O(1) перевірки доступності
+        self.occupied: Dict[Tuple[int, int, int], Tile] = {}
+        self.by_yz: Dict[Tuple[int, int], Set[int]] = {}
+        self.max_z = 0
+        self._build_index()
+        self.removed_count = 0  # Кількість видалених плиток
+        # Кеш доступних плиток; інвалідовується лише при видаленні пари
+        self._avail_cache: Optional[List[Tile]] = None
+        self._avail_dirty = True
+        # Скільки доступних плиток кожного типу; оновлюється інкрементно при видаленні
+        self._avail_flags: List[bool] = [self._check_available(tile) for tile in self.tiles]
+        self.available_type_counts: List[int] = [0] * len(TileType)
+        for tile, available in zip(self.tiles, self._avail_flags):
+            if available:
+                self.available_type_counts[tile.type_id] += 1
         
     def generate_board(self):
         """Генерує дошку з плитками у вигляді патерну"""
@@ -154,146 +291,118 @@ class Board:
             TileType.RED_DRAGON, TileType.GREEN_DRAGON, TileType.WHITE_DRAGON,
         ]
         
-        pairs = []
-        
         # Створюємо 72 пари (144 плитки загалом для патерну Turtle)
         # Кожен тип з'являється 4 рази (2 пари)
-        for tile_type in basic_tile_types:
-            pairs.extend([tile_type, tile_type, tile_type, tile_type])
+        pairs = [tile_type for tile_type in basic_tile_types for _ in range(4)]
         
         random.shuffle(pairs)
         
-        # Створюємо патерн дошки
-        pattern = self._create_pyramid_pattern()
+        # Патерн дошки (спільний для всіх дошок)
+        pattern = self._PATTERN
         
-        tile_index = 0
-        for z, layer in enumerate(pattern):
-            for y, row in enumerate(layer):
-                for x, has_tile in enumerate(row):
-                    if has_tile and tile_index < len(pairs):
-                        self.tiles.append(Tile(pairs[tile_index], x, y, z))
-                        tile_index += 1
-    
-    def _create_pyramid_pattern(self) -> List[List[List[bool]]]:
-        """Створює класичний патерн Turtle для Mahjong Solitaire"""
-        # Класичний патерн Turtle - найпопулярніший патерн
-        pattern = []
-        
-        # Шар 0 (нижній) - 144 плитки
-        layer0 = [
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, True, True, True, True, True, True, True, True, True, True, False, False, False, False],
-            [False, False, False, True, True, True, True, True, True, True, True, True, True, True, True, False, False, False],
-            [False, False, True, True, True, True, True, True, True, True, True, True, True, True, True, True, False, False],
-            [False, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, False],
-            [True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True],
-            [True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True],
-            [False, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, True, False],
-            [False, False, True, True, True, True, True, True, True, True, True, True, True, True, True, True, False, False],
-            [False, False, False, True, True, True, True, True, True, True, True, True, True, True, True, False, False, False],
-            [False, False, False, False, True, True, True, True, True, True, True, True, True, True, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-        ]
+        # Центруємо дошку (та сама формула, що використовується при малюванні)
+        board_start_x = SCREEN_WIDTH // 2 - (9 * TILE_SPACING_X)
         
-        # Шар 1 - 100 плиток
-        layer1 = [
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, True, True, True, True, True, True, True, True, False, False, False, False, False],
-            [False, False, False, False, True, True, True, True, True, True, True, True, True, True, False, False, False, False],
-            [False, False, False, True, True, True, True, True, True, True, True, True, True, True, True, False, False, False],
-            [False, False, True, True, True, True, True, True, True, True, True, True, True, True, True, True, False, False],
-            [False, False, True, True, True, True, True, True, True, True, True, True, True, True, True, True, False, False],
-            [False, False, False, True, True, True, True, True, True, True, True, True, True, True, True, False, False, False],
-            [False, False, False, False, True, True, True, True, True, True, True, True, True, True, False, False, False, False],
-            [False, False, False, False, False, True, True, True, True, True, True, True, True, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-        ]
-        
-        # Шар 2 - 64 плитки
-        layer2 = [
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, True, True, True, True, True, True, False, False, False, False, False, False],
-            [False, False, False, False, False, True, True, True, True, True, True, True, True, False, False, False, False, False],
-            [False, False, False, False, True, True, True, True, True, True, True, True, True, True, False, False, False, False],
-            [False, False, False, False, True, True, True, True, True, True, True, True, True, True, False, False, False, False],
-            [False, False, False, False, False, True, True, True, True, True, True, True, True, False, False, False, False, False],
-            [False, False, False, False, False, False, True, True, True, True, True, True, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-        ]
-        
-        # Шар 3 (верхній) - 36 плиток
-        layer3 = [
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, True, True, True, True, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, True, True, True, True, True, True, False, False, False, False, False, False],
-            [False, False, False, False, False, False, True, True, True, True, True, True, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, True, True, True, True, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-            [False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False, False],
-        ]
-        
-        return [layer0, layer1, layer2, layer3]
+        tile_index = 0
+        for z, mask in enumerate(pattern):
+            # Перебираємо лише встановлені біти (молодший біт першим = порядок y, x)
+            while mask and tile_index < len(pairs):
+                lsb = mask & -mask
+                y, x = divmod(lsb.bit_length() - 1, PATTERN_WIDTH)
+                mask ^= lsb
+                tile = Tile(pairs[tile_index], x, y, z)
+                tile.index = tile_index
+                tile.screen_x = board_start_x + x * TILE_SPACING_X + z * 3
+                tile.screen_y = 120 + y * TILE_SPACING_Y + z * 8
+                self.tiles.append(tile)
+                tile_index += 1
     
-    def is_tile_available(self, tile: Tile) -> bool:
-        """Перевіряє, чи плитка доступна для видалення (не заблокована зверху або з боків)"""
+    def _build_buckets(self):
+        """Розкладає плитки по клітинках екранної сітки для швидкого пошуку кліку"""
+        self.bucket.clear()
+        # hit_order вже відсортований зверху вниз, тож порядок у кошиках зберігається
+        for tile in self.hit_order:
+            for bx in range(tile.screen_x // TILE_WIDTH, (tile.screen_x + TILE_WIDTH) // TILE_WIDTH + 1):
+                for by in range(tile.screen_y // TILE_HEIGHT, (tile.screen_y + TILE_HEIGHT) // TILE_HEIGHT + 1):
+                    self.bucket.setdefault((bx, by), []).append(tile)
+    
+    def _build_index(self):
+        """Будує просторовий індекс (x, y, z) для живих плиток"""
+        self.occupied.clear()
+        self.by_yz.clear()
+        for tile in self.tiles:
+            if tile.removed:
+                continue
+            self.occupied[(tile.x, tile.y, tile.z)] = tile
+            self.by_yz.setdefault((tile.y, tile.z), set()).add(tile.x)
+        self.max_z = max((tile.z for tile in self.tiles), default=0)
+    
+    def _remove_tile(self, tile: Tile):
+        """Позначає плитку видаленою та прибирає її з індексу"""
+        tile.removed = True
+        self.removed_count += 1
+        self._avail_dirty = True
+        self.live_draw_order.remove(tile)
+        self.occupied.pop((tile.x, tile.y, tile.z), None)
+        row = self.by_yz.get((tile.y, tile.z))
+        if row is not None:
+            row.discard(tile.x)
+        
+        # Доступність могла змінитися лише у самої плитки, сусідів у рядку та плиток під нею
+        affected = [tile, self.occupied.get((tile.x - 1, tile.y, tile.z)),
+                    self.occupied.get((tile.x + 1, tile.y, tile.z))]
+        affected.extend(self.occupied.get((tile.x, tile.y, z)) for z in range(tile.z))
+        for other in affected:
+            if other is not None:
+                self._update_availability(other)
+    
+    def _update_availability(self, tile: Tile):
+        """Перераховує доступність плитки та лічильник її типу"""
+        available = self._check_available(tile)
+        if available != self._avail_flags[tile.index]:
+            self._avail_flags[tile.index] = available
+            self.available_type_counts[tile.type_id] += 1 if available else -1
+    
+    def _is_blocked_above(self, tile: Tile) -> bool:
+        """Чи є жива плитка зверху на тому ж x, y"""
+        # На верхньому шарі перевіряти нічого
+        if tile.z >= self.max_z:
+            return False
+        occupied = self.occupied
+        for z in range(tile.z + 1, self.max_z + 1):
+            if (tile.x, tile.y, z) in occupied:
+                return True
+        return False
+    
+    def _is_blocked_sides(self, tile: Tile) -> bool:
+        """Чи заблокована плитка з обох боків одночасно на своєму шарі"""
+        row = self.by_yz.get((tile.y, tile.z))
+        if not row or (tile.x - 1) not in row:
+            return False
+        return (tile.x + 1) in row
+    
+    def _check_available(self, tile: Tile) -> bool:
+        """Обчислює доступність плитки за просторовим індексом"""
         if tile.removed:
             return False
-        
-        # Перевіряємо, чи немає плиток зверху на тому ж x, y
-        for other_tile in self.tiles:
-            if other_tile.removed:
-                continue
-            if other_tile.x == tile.x and other_tile.y == tile.y and other_tile.z > tile.z:
-                return False
-        
-        # Перевіряємо, чи немає плиток з боків на тому ж z рівні
-        # Плитка доступна, якщо зліва або справа немає плиток на тому ж рівні
-        left_blocked = False
-        right_blocked = False
-        
-        for other_tile in self.tiles:
-            if other_tile.removed:
-                continue
-            if other_tile.z == tile.z:
-                if other_tile.y == tile.y:
-                    if other_tile.x == tile.x - 1:
-                        left_blocked = True
-                    if other_tile.x == tile.x + 1:
-                        right_blocked = True
-        
-        # Плитка доступна, якщо вона не заблокована з обох боків одночасно
-        return not (left_blocked and right_blocked)
+        return not self._is_blocked_above(tile) and not self._is_blocked_sides(tile)
+    
+    def is_tile_available(self, tile: Tile) -> bool:
+        """Перевіряє, чи плитка доступна для видалення (не заблокована зверху або з боків)"""
+        # Прапорці оновлюються при кожному видаленні, тож тут лише читання
+        return self._avail_flags[tile.index]
+    
+    def _refresh_available(self):
+        """Перераховує кеш доступних плиток, якщо дошка змінилася"""
+        if self._avail_dirty or self._avail_cache is None:
+            # Прапорці вже актуальні - кеш лише збирає з них список
+            self._avail_cache = [tile for tile, available in zip(self.tiles, self._avail_flags) if available]
+            self._avail_dirty = False
     
     def get_available_tiles(self) -> List[Tile]:
         """Повертає список доступних плиток"""
-        return [tile for tile in self.tiles if self.is_tile_available(tile)]
+        self._refresh_available()
+        return self._avail_cache
     
     def click_tile(self, tile: Tile):
         """Обробляє клік по плитці"""
@@ -315,12 +424,12 @@ class Board:
             # Скасовуємо вибір, якщо клікнули на ту саму плитку (той самий об'єкт)
             self.selected_tile.selected = False
             self.selected_tile = None
-        elif self.selected_tile.tile_type == tile.tile_type:
+        elif self.selected_tile.type_id == tile.type_id:
             # Знайдено пару! Перевіряємо, що обидві доступні
             if self.is_tile_available(self.selected_tile) and self.is_tile_available(tile):
                 # Видаляємо обидві плитки
-                self.selected_tile.removed = True
-                tile.removed = True
+                self._remove_tile(self.selected_tile)
+                self._remove_tile(tile)
                 self.selected_tile.selected = False
                 self.selected_tile = None
             else:
@@ -336,25 +445,20 @@ class Board:
     
     def is_game_won(self) -> bool:
         """Перевіряє, чи виграна гра"""
-        return all(tile.removed for tile in self.tiles)
+        return self.removed_count == len(self.tiles)
     
     def is_game_lost(self) -> bool:
         """Перевіряє, чи програна гра (немає доступних пар)"""
-        available = self.get_available_tiles()
-        if len(available) < 2:
-            return True
-        
-        # Перевіряємо, чи є хоча б одна пара серед доступних
-        for i, tile1 in enumerate(available):
-            for tile2 in available[i+1:]:
-                if tile1 == tile2:
-                    return False
-        return True
+        # Гра триває, якщо хоча б один тип доступний двічі
+        return max(self.available_type_counts, default=0) < 2
 
 
 class Game:
     """Головний клас гри"""
     
+    # Відступ інструкцій від верху панелі: заголовок (15 + 40), статистика (30), прогрес-бар (35)
+    INSTRUCTIONS_Y = 15 + 40 + 30 + 35
+    
     def __init__(self):
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Mahjong Solitaire")
@@ -364,7 +468,29 @@ class Game:
         self.small_font = pygame.font.Font(None, 24)
         self.running = True
         self.tile_images: Dict[TileType, pygame.Surface] = {}
+        self.tile_images_blocked: Dict[TileType, pygame.Surface] = {}  # Затемнені версії
+        # Готові лицьові сторони для плиток без зображень: (тип, вибрана, доступна) -> поверхня
+        self._tile_surf_cache: Dict[Tuple[TileType, bool, bool], pygame.Surface] = {}
+        # id() доступних плиток; перебудовується лише коли змінився кеш дошки
+        self._avail_ids: Set[int] = set()
+        self._avail_source: Optional[List[Tile]] = None
+        self._pair_hints: List[str] = []  # Назви типів з доступною парою
+        # LRU-кеш відрендереного тексту: (шрифт, текст, колір) -> поверхня
+        self._text_cache: OrderedDict = OrderedDict()
+        # Перемальовуємо лише змінені ділянки екрана
+        self.dirty_rects: List[pygame.Rect] = []
+        self._full_redraw = True
+        # Той самий прямокутник, що займає панель у draw_ui_panel
+        self.panel_rect = pygame.Rect(SCREEN_WIDTH - 280 - 10, 10, 280, SCREEN_HEIGHT - 20)
+        # Прогрес-бар під статистикою: готова поверхня перемальовується лише при зміні прогресу
+        self._progress_bg_rect = pygame.Rect(self.panel_rect.x + 10, self.panel_rect.y + 15 + 40 + 30,
+                                             self.panel_rect.width - 20, 20)
+        self._progress_fg_rect = pygame.Rect((0, 0), self._progress_bg_rect.size)
+        self._progress_surf = pygame.Surface(self._progress_bg_rect.size).convert()
+        self._progress_value = -1  # Кількість видалених плиток, для якої намальовано бар
         self.load_tile_images()
+        self._build_decorations()
+        self._build_static_panel()
     
     def load_tile_images(self):
         """Завантажує зображення плиток з папки assets/tiles"""
@@ -432,52 +558,43 @@ class Game:
         
         # Завантажуємо зображення для кожного типу плитки
         loaded_count = 0
+        images: Dict[TileType, pygame.Surface] = {}
         
-        # Спочатку отримуємо список всіх файлів у папці (case-insensitive)
-        existing_files = {}
-        if tiles_dir.exists():
-            for file_path in tiles_dir.glob("*.png"):
-                existing_files[file_path.name.lower()] = file_path
+        # Один прохід по папці замість stat() для кожного кандидата (case-insensitive)
+        existing_files = {file_path.name.lower(): file_path for file_path in tiles_dir.glob("*.png")}
         
         for tile_type, possible_names in tile_file_mapping.items():
             image_loaded = False
-            for filename in possible_names:
-                # Перевіряємо точну назву
-                file_path = tiles_dir / filename
-                if file_path.exists():
-                    try:
-                        img = pygame.image.load(str(file_path))
-                        # Масштабуємо до розміру плитки
-                        img = pygame.transform.scale(img, (TILE_WIDTH, TILE_HEIGHT))
-                        self.tile_images[tile_type] = img
-                        image_loaded = True
-                        loaded_count += 1
-                        break
-                    except pygame.error as e:
-                        print(f"⚠️  Помилка завантаження {filename}: {e}")
-                # Перевіряємо case-insensitive
-                elif filename.lower() in existing_files:
-                    try:
-                        actual_path = existing_files[filename.lower()]
-                        img = pygame.image.load(str(actual_path))
-                        img = pygame.transform.scale(img, (TILE_WIDTH, TILE_HEIGHT))
-                        self.tile_images[tile_type] = img
-                        image_loaded = True
-                        loaded_count += 1
-                        break
-                    except pygame.error as e:
-                        print(f"⚠️  Помилка завантаження {actual_path.name}: {e}")
+            # Варіанти, що відрізняються лише регістром, дають один і той самий ключ
+            for filename in dict.fromkeys(name.lower() for name in possible_names):
+                actual_path = existing_files.get(filename)
+                if actual_path is None:
+                    continue
+                try:
+                    img = pygame.image.load(str(actual_path))
+                    # Масштабуємо до розміру плитки
+                    img = pygame.transform.scale(img, (TILE_WIDTH, TILE_HEIGHT))
+                    # Переводимо у формат дисплея, щоб blit не конвертував пікселі щокадру
+                    img = img.convert_alpha()
+                    images[tile_type] = img
+                    image_loaded = True
+                    loaded_count += 1
+                    break
+                except pygame.error as e:
+                    print(f"⚠️  Помилка завантаження {actual_path.name}: {e}")
             
             if not image_loaded:
                 # Якщо зображення не знайдено, створюємо placeholder
-                placeholder = pygame.Surface((TILE_WIDTH, TILE_HEIGHT))
+                placeholder = pygame.Surface((TILE_WIDTH, TILE_HEIGHT)).convert()
                 placeholder.fill(TILE_COLOR)
                 pygame.draw.rect(placeholder, TILE_BORDER, (0, 0, TILE_WIDTH, TILE_HEIGHT), 2)
                 # Додаємо текст як fallback
                 text = self.small_font.render(tile_type.value, True, (0, 0, 0))
                 text_rect = text.get_rect(center=(TILE_WIDTH // 2, TILE_HEIGHT // 2))
                 placeholder.blit(text, text_rect)
-                self.tile_images[tile_type] = placeholder
+                images[tile_type] = placeholder
+        
+        self._build_atlas(images)
         
         if loaded_count > 0:
             print(f"✅ Завантажено {loaded_count} зображень плиток")
@@ -485,127 +602,139 @@ class Game:
             print("⚠️  Зображення плиток не знайдено. Використовуються placeholder'и.")
             print(f"💡 Завантаж зображення у папку {tiles_dir}")
         
+    def _build_atlas(self, images: Dict[TileType, pygame.Surface]):
+        """Збирає всі зображення плиток в один атлас і видає їх як subsurface"""
+        columns = 7
+        rows = (len(images) + columns - 1) // columns
+        atlas = pygame.Surface((TILE_WIDTH * columns, TILE_HEIGHT * rows), pygame.SRCALPHA).convert_alpha()
+        atlas.fill((0, 0, 0, 0))
+        
+        for i, (tile_type, img) in enumerate(images.items()):
+            rect = pygame.Rect((i % columns) * TILE_WIDTH, (i // columns) * TILE_HEIGHT,
+                               TILE_WIDTH, TILE_HEIGHT)
+            # BLEND_RGBA_MAX на прозорому фоні копіює пікселі разом з альфою без змішування
+            atlas.blit(img, rect, special_flags=pygame.BLEND_RGBA_MAX)
+            self.tile_images[tile_type] = atlas.subsurface(rect)
+        
+        # Затемнений атлас для заблокованих плиток
+        blocked_atlas = self._build_blocked_atlas(atlas)
+        for tile_type, image in self.tile_images.items():
+            self.tile_images_blocked[tile_type] = blocked_atlas.subsurface(image.get_offset(), image.get_size())
+    
+    @staticmethod
+    def _build_blocked_atlas(atlas: pygame.Surface) -> pygame.Surface:
+        """Запікає сіре накладання (alpha 150) поверх атласу в одну RGBA поверхню"""
+        # Накладання перекриває і прозорі пікселі плитки, тому результат не можна отримати
+        # простим blit'ом на копію: рахуємо колір і альфу композиції "overlay поверх плитки"
+        overlay_alpha = 150 / 255
+        tile_alpha = pygame.surfarray.array_alpha(atlas).astype(np.float32)[..., None] / 255
+        tile_rgb = pygame.surfarray.array3d(atlas).astype(np.float32)
+        out_alpha = 1 - (1 - overlay_alpha) * (1 - tile_alpha)
+        out_rgb = (overlay_alpha * np.array(BLOCKED_COLOR, dtype=np.float32)
+                   + (1 - overlay_alpha) * tile_alpha * tile_rgb) / out_alpha
+        
+        blocked_atlas = atlas.copy()
+        pixels = pygame.surfarray.pixels3d(blocked_atlas)
+        pixels[...] = np.rint(out_rgb).astype(np.uint8)
+        del pixels
+        alpha = pygame.surfarray.pixels_alpha(blocked_atlas)
+        alpha[...] = np.rint(out_alpha[..., 0] * 255).astype(np.uint8)
+        del alpha
+        return blocked_atlas
+    
     def get_tile_at_position(self, pos: Tuple[int, int]) -> Optional[Tile]:
         """Знаходить плитку за координатами миші"""
         mouse_x, mouse_y = pos
         
-        # Центруємо дошку (та сама логіка, що й у draw_tile)
-        board_center_x = SCREEN_WIDTH // 2
-        board_start_x = board_center_x - (9 * TILE_SPACING_X)
-        
-        # Перевіряємо плитки зверху вниз (спочатку верхні шари)
-        for tile in sorted(self.board.tiles, key=lambda t: (-t.z, t.y, t.x)):
+        # Перевіряємо лише плитки з клітинки під курсором (вже впорядковані зверху вниз)
+        for tile in self.board.bucket.get((mouse_x // TILE_WIDTH, mouse_y // TILE_HEIGHT), ()):
             if tile.removed:
                 continue
             
-            # Обчислюємо позицію плитки на екрані з урахуванням 3D (та сама формула, що й у draw_tile)
-            screen_x = board_start_x + tile.x * TILE_SPACING_X + tile.z * 3
-            screen_y = 120 + tile.y * TILE_SPACING_Y + tile.z * 8
-            
+            screen_x = tile.screen_x
+            screen_y = tile.screen_y
             if (screen_x <= mouse_x <= screen_x + TILE_WIDTH and
                 screen_y <= mouse_y <= screen_y + TILE_HEIGHT):
                 return tile
         return None
     
-    def draw_tile(self, tile: Tile):
-        """Малює одну плитку"""
-        if tile.removed:
-            return
-        
-        # Центруємо дошку
-        board_center_x = SCREEN_WIDTH // 2
-        board_start_x = board_center_x - (9 * TILE_SPACING_X)
-        
-        # Обчислюємо позицію з урахуванням 3D
-        screen_x = board_start_x + tile.x * TILE_SPACING_X + tile.z * 3
-        screen_y = 120 + tile.y * TILE_SPACING_Y + tile.z * 8
-        
-        # Отримуємо зображення плитки
-        tile_image = self.tile_images.get(tile.tile_type)
-        
-        if tile_image:
-            # Перевіряємо доступність
-            is_available = self.board.is_tile_available(tile)
-            
-            # Якщо плитка вибрана, додаємо золотий контур
+    def _build_decorations(self):
+        """Заздалегідь малює контури та бічні грані, щоб плитки виводилися лише blit'ами"""
+        # Товстіший золотий контур для вибраної, тонкий зелений - для доступних
+        self.outline_selected = pygame.Surface((TILE_WIDTH + 8, TILE_HEIGHT + 8), pygame.SRCALPHA).convert_alpha()
+        self.outline_selected.fill((0, 0, 0, 0))
+        pygame.draw.rect(self.outline_selected, SELECTED_COLOR, self.outline_selected.get_rect(), 4)
+        self.outline_available = pygame.Surface((TILE_WIDTH + 4, TILE_HEIGHT + 4), pygame.SRCALPHA).convert_alpha()
+        self.outline_available.fill((0, 0, 0, 0))
+        pygame.draw.rect(self.outline_available, AVAILABLE_COLOR, self.outline_available.get_rect(), 2)
+        
+        # Бічна грань (для 3D ефекту) для доступної та заблокованої плитки
+        points = [(0, 0), (TILE_DEPTH, TILE_DEPTH), (TILE_WIDTH + TILE_DEPTH, TILE_DEPTH), (TILE_WIDTH, 0)]
+        self.side_faces: Dict[bool, pygame.Surface] = {}
+        for is_available, color in ((True, TILE_COLOR), (False, (200, 200, 200))):
+            face = pygame.Surface((TILE_WIDTH + TILE_DEPTH + 1, TILE_DEPTH + 1), pygame.SRCALPHA).convert_alpha()
+            face.fill((0, 0, 0, 0))
+            pygame.draw.polygon(face, (color[0] - 30, color[1] - 30, color[2] - 30), points)
+            self.side_faces[is_available] = face
+    
+    def _blit_batch(self, blit_list: List[Tuple[pygame.Surface, Tuple[int, int]]]):
+        """Виводить пакет (поверхня, позиція) одним викликом у C"""
+        # Новіші pygame / pygame-ce мають швидший fblits без повернення прямокутників
+        if hasattr(self.screen, "fblits"):
+            self.screen.fblits(blit_list)
+        else:
+            self.screen.blits(blit_list, doreturn=False)
+    
+    def _fallback_face(self, tile: Tile, is_available: bool) -> pygame.Surface:
+        """Повертає (з кешу) лицьову сторону плитки без зображення"""
+        key = (tile.tile_type, tile.selected, is_available)
+        face = self._tile_surf_cache.get(key)
+        if face is None:
+            color = SELECTED_COLOR if tile.selected else (TILE_COLOR if is_available else (200, 200, 200))
+            face = pygame.Surface((TILE_WIDTH, TILE_HEIGHT)).convert()
+            face.fill(color)
+            pygame.draw.rect(face, TILE_BORDER, face.get_rect(), 2)
+            text = self.small_font.render(tile.get_display_name(), True, (0, 0, 0))
+            face.blit(text, text.get_rect(center=(TILE_WIDTH // 2, TILE_HEIGHT // 2)))
+            self._tile_surf_cache[key] = face
+        return face
+    
+    def _tile_blits(self, tile: Tile, blit_list: List[Tuple[pygame.Surface, Tuple[int, int]]]):
+        """Додає в blit_list поверхні плитки у порядку малювання"""
+        screen_x = tile.screen_x
+        screen_y = tile.screen_y
+        is_available = id(tile) in self._avail_ids
+        
+        if tile.tile_type in self.tile_images:
+            # Контур малюється під плиткою, як і раніше
             if tile.selected:
-                # Товстіший золотий контур для вибраної
-                pygame.draw.rect(self.screen, SELECTED_COLOR,
-                               (screen_x - 4, screen_y - 4, TILE_WIDTH + 8, TILE_HEIGHT + 8), 4)
+                blit_list.append((self.outline_selected, (screen_x - 4, screen_y - 4)))
             elif is_available:
-                # Тонкий зелений контур для доступних плиток
-                pygame.draw.rect(self.screen, AVAILABLE_COLOR,
-                               (screen_x - 2, screen_y - 2, TILE_WIDTH + 4, TILE_HEIGHT + 4), 2)
-            
-            # Малюємо саму плитку
-            self.screen.blit(tile_image, (screen_x, screen_y))
+                blit_list.append((self.outline_available, (screen_x - 2, screen_y - 2)))
             
-            # Якщо плитка заблокована, додаємо затемнення
-            if not is_available:
-                overlay = pygame.Surface((TILE_WIDTH, TILE_HEIGHT))
-                overlay.set_alpha(150)
-                overlay.fill(BLOCKED_COLOR)
-                self.screen.blit(overlay, (screen_x, screen_y))
+            # Сама плитка (заблоковані - заздалегідь затемненою версією)
+            images = self.tile_images if is_available else self.tile_images_blocked
+            blit_list.append((images[tile.tile_type], (screen_x, screen_y)))
         else:
-            # Fallback: малюємо плитку без зображення (старий спосіб)
-            color = SELECTED_COLOR if tile.selected else (TILE_COLOR if self.board.is_tile_available(tile) else (200, 200, 200))
-            pygame.draw.rect(self.screen, color, (screen_x, screen_y, TILE_WIDTH, TILE_HEIGHT))
-            pygame.draw.rect(self.screen, TILE_BORDER, (screen_x, screen_y, TILE_WIDTH, TILE_HEIGHT), 2)
-            text = self.small_font.render(tile.get_display_name(), True, (0, 0, 0))
-            text_rect = text.get_rect(center=(screen_x + TILE_WIDTH // 2, screen_y + TILE_HEIGHT // 2))
-            self.screen.blit(text, text_rect)
+            # Fallback: плитка без зображення (колір, рамка й підпис)
+            blit_list.append((self._fallback_face(tile, is_available), (screen_x, screen_y)))
         
         # Бічна грань (для 3D ефекту)
         if tile.z > 0:
-            color = TILE_COLOR if self.board.is_tile_available(tile) else (200, 200, 200)
-            points = [
-                (screen_x, screen_y + TILE_HEIGHT),
-                (screen_x + TILE_DEPTH, screen_y + TILE_HEIGHT + TILE_DEPTH),
-                (screen_x + TILE_WIDTH + TILE_DEPTH, screen_y + TILE_HEIGHT + TILE_DEPTH),
-                (screen_x + TILE_WIDTH, screen_y + TILE_HEIGHT)
-            ]
-            pygame.draw.polygon(self.screen, (color[0] - 30, color[1] - 30, color[2] - 30), points)
+            blit_list.append((self.side_faces[is_available], (screen_x, screen_y + TILE_HEIGHT)))
+        return blit_list
     
-    def draw_ui_panel(self):
-        """Малює панель з інформацією та інструкціями"""
-        panel_width = 280
-        panel_x = SCREEN_WIDTH - panel_width - 10
-        panel_y = 10
-        
+    def _build_static_panel(self):
+        """Один раз малює незмінну частину панелі: фон, заголовок та інструкції"""
+        panel = pygame.Surface(self.panel_rect.size, pygame.SRCALPHA).convert_alpha()
         # Напівпрозорий фон панелі
-        panel_surface = pygame.Surface((panel_width, SCREEN_HEIGHT - 20))
-        panel_surface.set_alpha(220)
-        panel_surface.fill(UI_PANEL_COLOR)
-        self.screen.blit(panel_surface, (panel_x, panel_y))
-        
-        y_offset = panel_y + 15
+        panel.fill((*UI_PANEL_COLOR, 220))
         
         # Заголовок
         title = self.font.render("Mahjong Solitaire", True, TEXT_COLOR)
-        self.screen.blit(title, (panel_x + 10, y_offset))
-        y_offset += 40
-        
-        # Статистика
-        total_tiles = len(self.board.tiles)
-        removed_tiles = sum(1 for t in self.board.tiles if t.removed)
-        remaining = total_tiles - removed_tiles
-        
-        stats_text = self.small_font.render(f"Плиток: {remaining} / {total_tiles}", True, TEXT_COLOR)
-        self.screen.blit(stats_text, (panel_x + 10, y_offset))
-        y_offset += 30
+        panel.blit(title, (10, 15))
         
-        # Прогрес-бар
-        if total_tiles > 0:
-            progress = removed_tiles / total_tiles
-            bar_width = panel_width - 20
-            bar_height = 20
-            pygame.draw.rect(self.screen, (50, 50, 50), 
-                           (panel_x + 10, y_offset, bar_width, bar_height))
-            pygame.draw.rect(self.screen, (0, 255, 0), 
-                           (panel_x + 10, y_offset, int(bar_width * progress), bar_height))
-        y_offset += 35
-        
-        # Інструкції
+        # Інструкції (під статистикою та прогрес-баром)
         instructions = [
             "ПРАВИЛА ГРИ:",
             "",
@@ -626,76 +755,199 @@ class Game:
             "   плитки!",
         ]
         
+        y_offset = self.INSTRUCTIONS_Y
         for line in instructions:
             if line:
                 text = self.small_font.render(line, True, TEXT_COLOR)
-                self.screen.blit(text, (panel_x + 10, y_offset))
+                panel.blit(text, (10, y_offset))
             y_offset += 20
         
+        self._static_panel = panel
+        self._instructions_end_y = y_offset
+    
+    def _render(self, text: str, color: Tuple[int, int, int],
+                font: Optional[pygame.font.Font] = None) -> pygame.Surface:
+        """Рендерить текст через LRU-кеш (за замовчуванням - малим шрифтом)"""
+        font = font or self.small_font
+        key = (id(font), text, color)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            surface = font.render(text, True, color).convert_alpha()
+            self._text_cache[key] = surface
+            if len(self._text_cache) > TEXT_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
+        else:
+            self._text_cache.move_to_end(key)
+        return surface
+    
+    def draw_ui_panel(self):
+        """Малює панель з інформацією та інструкціями"""
+        panel_width = self.panel_rect.width
+        panel_x = self.panel_rect.x
+        panel_y = self.panel_rect.y
+        
+        # Фон, заголовок та інструкції - одним blit'ом
+        self.screen.blit(self._static_panel, (panel_x, panel_y))
+        
+        y_offset = panel_y + 15 + 40
+        
+        # Статистика
+        total_tiles = len(self.board.tiles)
+        removed_tiles = self.board.removed_count
+        remaining = total_tiles - removed_tiles
+        
+        stats_text = self._render(f"Плиток: {remaining} / {total_tiles}", TEXT_COLOR)
+        self.screen.blit(stats_text, (panel_x + 10, y_offset))
+        
+        # Прогрес-бар (поверхня оновлюється лише після видалення пари)
+        if total_tiles > 0:
+            if removed_tiles != self._progress_value:
+                progress = removed_tiles / total_tiles
+                self._progress_fg_rect.width = int(self._progress_bg_rect.width * progress)
+                self._progress_surf.fill((50, 50, 50))
+                self._progress_surf.fill((0, 255, 0), self._progress_fg_rect)
+                self._progress_value = removed_tiles
+            self.screen.blit(self._progress_surf, self._progress_bg_rect)
+        
+        y_offset = panel_y + self._instructions_end_y
         y_offset += 10
         
-        # Підказки про доступні пари
-        available = self.board.get_available_tiles()
-        if available:
-            # Шукаємо доступні пари
-            pairs_found = []
-            for i, tile1 in enumerate(available):
-                for tile2 in available[i+1:]:
-                    if tile1 == tile2:
-                        pairs_found.append((tile1.tile_type, tile1.get_display_name()))
-                        break
+        # Підказки про доступні пари (перераховуються лише після ходу)
+        if self._pair_hints:
+            hint_text = self._render("Доступні пари:", HINT_COLOR)
+            self.screen.blit(hint_text, (panel_x + 10, y_offset))
+            y_offset += 25
             
-            if pairs_found:
-                hint_text = self.small_font.render("Доступні пари:", True, HINT_COLOR)
-                self.screen.blit(hint_text, (panel_x + 10, y_offset))
-                y_offset += 25
-                
-                for tile_type, name in pairs_found[:5]:  # Показуємо до 5 пар
-                    pair_text = self.small_font.render(f"  • {name}", True, HINT_COLOR)
-                    self.screen.blit(pair_text, (panel_x + 10, y_offset))
-                    y_offset += 20
+            for name in self._pair_hints[:5]:  # Показуємо до 5 пар
+                pair_text = self._render(f"  • {name}", HINT_COLOR)
+                self.screen.blit(pair_text, (panel_x + 10, y_offset))
+                y_offset += 20
         
         # Статус гри
         y_offset = SCREEN_HEIGHT - 80
         if self.board.is_game_won():
-            status_text = self.font.render("ВИГРАВ! 🎉", True, SELECTED_COLOR)
+            status_text = self._render("ВИГРАВ! 🎉", SELECTED_COLOR, self.font)
             text_rect = status_text.get_rect(center=(panel_x + panel_width // 2, y_offset))
             self.screen.blit(status_text, text_rect)
         elif self.board.is_game_lost():
-            status_text = self.font.render("ПРОГРАВ 😢", True, (255, 100, 100))
+            status_text = self._render("ПРОГРАВ 😢", (255, 100, 100), self.font)
             text_rect = status_text.get_rect(center=(panel_x + panel_width // 2, y_offset))
             self.screen.blit(status_text, text_rect)
     
-    def draw(self):
-        """Малює весь екран"""
+    def _refresh_available(self):
+        """Оновлює множину доступних плиток, якщо дошка змінилася"""
+        available = self.board.get_available_tiles()
+        if available is not self._avail_source:
+            self._avail_ids = {id(tile) for tile in available}
+            self._avail_source = available
+            
+            # Типи, що доступні щонайменше двічі, у порядку першої появи (без повторів)
+            counts = self.board.available_type_counts
+            seen_types: Set[int] = set()
+            self._pair_hints = []
+            for tile in available:
+                if tile.type_id not in seen_types and counts[tile.type_id] >= 2:
+                    seen_types.add(tile.type_id)
+                    self._pair_hints.append(tile.get_display_name())
+    
+    def _tile_rect(self, tile: Tile) -> pygame.Rect:
+        """Прямокутник плитки разом з контуром (4 px) і бічною гранню"""
+        return pygame.Rect(tile.screen_x - 4, tile.screen_y - 4,
+                           TILE_WIDTH + TILE_DEPTH + 5, TILE_HEIGHT + TILE_DEPTH + 5)
+    
+    def _draw_scene(self, area: Optional[pygame.Rect] = None):
+        """Малює фон, плитки та панель; якщо задано area - лише те, що її перетинає"""
+        self.screen.set_clip(area)
         self.screen.fill(BACKGROUND_COLOR)
         
-        # Малюємо всі плитки
-        for tile in sorted(self.board.tiles, key=lambda t: (t.z, t.y, t.x)):
-            self.draw_tile(tile)
+        # Малюємо плитки одним пакетом (порядок художника: знизу вгору); видалені сюди не потрапляють
+        tiles = self.board.live_draw_order
+        if area is not None:
+            tiles = [tile for tile in tiles if area.colliderect(self._tile_rect(tile))]
+        blit_list: List[Tuple[pygame.Surface, Tuple[int, int]]] = []
+        for tile in tiles:
+            self._tile_blits(tile, blit_list)
+        self._blit_batch(blit_list)
         
         # Малюємо UI панель
-        self.draw_ui_panel()
+        if area is None or area.colliderect(self.panel_rect):
+            self.draw_ui_panel()
         
-        pygame.display.flip()
+        self.screen.set_clip(None)
+    
+    def draw(self):
+        """Малює весь екран або лише змінені ділянки"""
+        self._refresh_available()
+        
+        dirty_rects = self._merge_rects(self.dirty_rects) if self.dirty_rects else []
+        # Багато або великих ділянок дешевше перемалювати цілком одним flip()
+        if dirty_rects and (len(dirty_rects) > 3 or
+                            sum(r.width * r.height for r in dirty_rects) >= SCREEN_WIDTH * SCREEN_HEIGHT // 4):
+            self._full_redraw = True
+        
+        if self._full_redraw:
+            self._draw_scene()
+            pygame.display.flip()
+            self._full_redraw = False
+        elif dirty_rects:
+            for rect in dirty_rects:
+                self._draw_scene(rect)
+            pygame.display.update(dirty_rects)
+        self.dirty_rects = []
+    
+    @staticmethod
+    def _merge_rects(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+        """Об'єднує прямокутники, що перетинаються, щоб не перемальовувати ділянки двічі"""
+        merged: List[pygame.Rect] = []
+        for rect in rects:
+            rect = rect.copy()
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect.union_ip(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+    
+    def _on_tile_click(self, tile: Tile):
+        """Передає клік дошці й позначає брудними плитки, чий вигляд змінився"""
+        prev_selected = self.board.selected_tile
+        prev_avail_ids = self._avail_ids
+        self.board.click_tile(tile)
+        self._refresh_available()
+        
+        # Змінюється вибір, видалені плитки та сусіди, які стали доступними
+        changed = {id(t) for t in (prev_selected, tile, self.board.selected_tile) if t is not None}
+        changed |= prev_avail_ids ^ self._avail_ids
+        for board_tile in self.board.tiles:
+            if id(board_tile) in changed:
+                self.dirty_rects.append(self._tile_rect(board_tile))
+        # Статистика, підказки й статус на панелі залежать від стану дошки
+        self.dirty_rects.append(self.panel_rect)
     
     def handle_events(self):
         """Обробляє події"""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                # Вміст вікна втрачено - перемальовуємо повністю
+                self._full_redraw = True
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Ліва кнопка миші
                     tile = self.get_tile_at_position(event.pos)
                     if tile:
-                        self.board.click_tile(tile)
+                        self._on_tile_click(tile)
     
     def run(self):
         """Головний цикл гри"""
+        # Наведення миші нічого не підсвічує - не засмічуємо чергу подій
+        pygame.event.set_blocked(pygame.MOUSEMOTION)
         while self.running:
             self.handle_events()
-            self.draw()
-            self.clock.tick(60)
+            # Малюємо лише коли щось змінилося
+            if self._full_redraw or self.dirty_rects:
+                self.draw()
+            self.clock.tick(FPS)
         
         pygame.quit()
 
@@ -5,18 +5,24 @@ Mahjong Solitaire Game на Flet
 
 import flet as ft
 import json
+import logging
 import random
 import threading
 import time
 import asyncio
 import sqlite3
 import hashlib
+import hmac
 import secrets
+import numpy as np
 from pathlib import Path
+from types import MappingProxyType
 from enum import Enum
-from typing import Any, List, Tuple, Optional, Dict
-from collections import deque
+from typing import Any, List, Tuple, Optional, Dict, Iterator, Mapping
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 
 # Умовний імпорт winsound (тільки на Windows)
 try:
@@ -26,6 +32,10 @@ except ImportError:
     HAS_WINSOUND = False
     winsound = None
 
+# Налагоджувальні повідомлення - через logging: аргументи форматуються лише
+# якщо рівень DEBUG увімкнено (за замовчуванням вимкнено)
+logger = logging.getLogger(__name__)
+
 # Константи
 TILE_WIDTH = 50
 TILE_HEIGHT = 70
@@ -61,7 +71,7 @@ def load_game_records_from_disk() -> List[dict]:
     if not RECORDS_FILE.exists():
         return []
     try:
-        payload = json.loads(RECORDS_FILE.read_text(encoding="utf-8"))
+        payload = json.loads(RECORDS_FILE.read_bytes())
         if isinstance(payload, list):
             return payload[:5]
     except Exception:
@@ -77,29 +87,125 @@ def save_game_records_to_disk(records: List[dict]):
         pass
 
 
+# Кеш ключів, розмножених до довжини даних (довжина округлюється до степеня двійки)
+_XOR_KEY_CACHE: Dict[Tuple[bytes, int], np.ndarray] = {}
+
+
+def _tiled_key(key: bytes, length: int) -> np.ndarray:
+    size = 1 << max(length - 1, 0).bit_length()
+    tiled = _XOR_KEY_CACHE.get((key, size))
+    if tiled is None:
+        tiled = np.resize(np.frombuffer(key, dtype=np.uint8), size)
+        _XOR_KEY_CACHE[(key, size)] = tiled
+    return tiled[:length]
+
+
 def _xor_encrypt(data: bytes, key: bytes) -> bytes:
-    return bytes(b ^ key[i % len(key)] for i, b in enumerate(data))
+    arr = np.frombuffer(data, dtype=np.uint8)
+    return np.bitwise_xor(arr, _tiled_key(key, len(arr))).tobytes()
+
+
+# Спільне з'єднання з розшифрованою базою в пам'яті (файл дешифрується лише раз)
+_DB_CONN: Optional[sqlite3.Connection] = None
+# (mtime_ns, розмір) файлу бази на момент останнього читання/запису. Якщо файл змінив
+# інший процес (наприклад, тестовий скрипт), перед наступним запитом база перечитується,
+# а не перезаписується старою копією. Одночасні записи з кількох процесів не зливаються -
+# змінювати базу одночасно має лише один процес
+_DB_FILE_STAMP: Optional[Tuple[int, int]] = None
+# З'єднання спільне для всіх сесій і потоків обробників Flet - кожна транзакція
+# (від отримання з'єднання до commit/rollback) виконується під цим блокуванням
+_DB_LOCK = threading.RLock()
+
+
+def _db_file_stamp() -> Optional[Tuple[int, int]]:
+    try:
+        stat = DB_FILE_ENC.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _close_db_connection():
+    """Закриває спільне з'єднання; наступний запит прочитає базу з файлу заново"""
+    global _DB_CONN, _DB_FILE_STAMP
+    with _DB_LOCK:
+        if _DB_CONN is not None:
+            _DB_CONN.close()
+        _DB_CONN = None
+        _DB_FILE_STAMP = None
 
 
 def load_encrypted_db() -> Path:
     """Дешифрує файл бази sqlite у тимчасовий файл та повертає шлях"""
-    if not DB_FILE_ENC.exists():
-        # create empty sqlite database and encrypt it
-        conn = sqlite3.connect(DB_FILE_PLAIN)
-        conn.close()
-        encrypted = _xor_encrypt(DB_FILE_PLAIN.read_bytes(), DB_SECRET_KEY)
-        DB_FILE_ENC.write_bytes(encrypted)
-        DB_FILE_PLAIN.unlink()
-    encrypted = DB_FILE_ENC.read_bytes()
-    DB_FILE_PLAIN.write_bytes(_xor_encrypt(encrypted, DB_SECRET_KEY))
-    return DB_FILE_PLAIN
+    with _DB_LOCK:
+        if not DB_FILE_ENC.exists():
+            # create empty sqlite database and encrypt it
+            conn = sqlite3.connect(DB_FILE_PLAIN)
+            conn.close()
+            encrypted = _xor_encrypt(DB_FILE_PLAIN.read_bytes(), DB_SECRET_KEY)
+            DB_FILE_ENC.write_bytes(encrypted)
+            DB_FILE_PLAIN.unlink()
+        encrypted = DB_FILE_ENC.read_bytes()
+        DB_FILE_PLAIN.write_bytes(_xor_encrypt(encrypted, DB_SECRET_KEY))
+        return DB_FILE_PLAIN
 
 
 def save_encrypted_db(db_path: Path):
     """Шифрує sqlite файл та видаляє тимчасовий"""
-    data = db_path.read_bytes()
-    DB_FILE_ENC.write_bytes(_xor_encrypt(data, DB_SECRET_KEY))
-    db_path.unlink(missing_ok=True)
+    with _DB_LOCK:
+        data = db_path.read_bytes()
+        DB_FILE_ENC.write_bytes(_xor_encrypt(data, DB_SECRET_KEY))
+        db_path.unlink(missing_ok=True)
+        # База змінена в обхід спільного з'єднання - при наступному запиті перечитуємо її
+        _close_db_connection()
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Повертає довгоживуче з'єднання з базою, за потреби (пере)читаючи її з файлу"""
+    global _DB_CONN, _DB_FILE_STAMP
+    with _DB_LOCK:
+        stamp = _db_file_stamp()
+        if _DB_CONN is not None and stamp != _DB_FILE_STAMP and not _DB_CONN.in_transaction:
+            # Файл змінено ззовні - відкидаємо застарілу копію в пам'яті
+            _close_db_connection()
+        if _DB_CONN is None:
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+            if stamp is not None:
+                data = _xor_encrypt(DB_FILE_ENC.read_bytes(), DB_SECRET_KEY)
+                if data:
+                    conn.deserialize(data)
+            _DB_CONN = conn
+            _DB_FILE_STAMP = stamp
+        return _DB_CONN
+
+
+def flush_encrypted_db():
+    """Шифрує поточний стан бази з пам'яті у файл"""
+    global _DB_FILE_STAMP
+    with _DB_LOCK:
+        if _DB_CONN is not None:
+            DB_FILE_ENC.write_bytes(_xor_encrypt(_DB_CONN.serialize(), DB_SECRET_KEY))
+            _DB_FILE_STAMP = _db_file_stamp()
+
+
+def commit_db(conn: sqlite3.Connection):
+    """Фіксує зміни та одразу зберігає зашифровану базу на диск"""
+    with _DB_LOCK:
+        conn.commit()
+        flush_encrypted_db()
+
+
+@contextmanager
+def db_transaction() -> Iterator[sqlite3.Connection]:
+    """Видає спільне з'єднання під блокуванням. Зміни фіксуються явним commit_db();
+    все незафіксоване (в т.ч. при винятку) на виході відкочується"""
+    with _DB_LOCK:
+        conn = get_db_connection()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
 
 
 def save_remembered_credentials(username: str, password: str):
@@ -113,7 +219,7 @@ def load_remembered_credentials() -> Optional[Dict[str, str]]:
     try:
         raw = REMEMBER_FILE.read_bytes()
         payload = _xor_encrypt(raw, DB_SECRET_KEY)
-        data = json.loads(payload.decode("utf-8"))
+        data = json.loads(payload)
         if "username" in data and "password" in data:
             return data
     except Exception:
@@ -126,102 +232,124 @@ def clear_remembered_credentials():
         REMEMBER_FILE.unlink(missing_ok=True)
 
 
+def _now_iso() -> str:
+    """Поточний час у форматі ISO для записів у базі"""
+    return datetime.now().isoformat()
+
+
+# Чисті функції з малим набором входів (секунди гри, час записів) - кешуємо,
+# щоб таймер і таблиці не форматували той самий рядок повторно
+@lru_cache(maxsize=4096)
 def format_duration(seconds: int) -> str:
     minutes = seconds // 60
     secs = seconds % 60
     return f"{minutes:02d}:{secs:02d}"
 
 
+@lru_cache(maxsize=1024)
+def format_timestamp(iso_timestamp: str) -> str:
+    """Форматує ISO timestamp в короткий формат"""
+    try:
+        # Парсимо ISO формат
+        dt = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
+        # Форматуємо як "22.11.2025 13:56" з меншим розміром
+        return dt.strftime("%d.%m.%Y %H:%M")
+    except:
+        # Якщо не вдалося розпарсити - повертаємо як є, але обрізаємо
+        return iso_timestamp[:16] if len(iso_timestamp) > 16 else iso_timestamp
+
+
 def initialize_db():
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS profiles (
-            id INTEGER PRIMARY KEY,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            salt TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            coins INTEGER DEFAULT 10,
-            hints INTEGER DEFAULT 0,
-            shuffles INTEGER DEFAULT 0,
-            role TEXT DEFAULT 'user',
-            email TEXT
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                id INTEGER PRIMARY KEY,
+                username TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                salt TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                coins INTEGER DEFAULT 10,
+                hints INTEGER DEFAULT 0,
+                shuffles INTEGER DEFAULT 0,
+                role TEXT DEFAULT 'user',
+                email TEXT
+            )
+            """
         )
-        """
-    )
-    # Додаємо поле coins для існуючих користувачів, якщо його немає
-    try:
-        cursor.execute("ALTER TABLE profiles ADD COLUMN coins INTEGER DEFAULT 10")
-    except sqlite3.OperationalError:
-        pass  # Колонка вже існує
-    # Оновлюємо coins для користувачів, у яких coins NULL
-    cursor.execute("UPDATE profiles SET coins = 10 WHERE coins IS NULL")
-    # Додаємо поля hints та shuffles для існуючих користувачів
-    try:
-        cursor.execute("ALTER TABLE profiles ADD COLUMN hints INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        cursor.execute("ALTER TABLE profiles ADD COLUMN shuffles INTEGER DEFAULT 0")
-    except sqlite3.OperationalError:
-        pass
-    # Додаємо поле role для існуючих користувачів, якщо його немає
-    try:
-        cursor.execute("ALTER TABLE profiles ADD COLUMN role TEXT DEFAULT 'user'")
-    except sqlite3.OperationalError:
-        pass
-    # Додаємо поле email для існуючих користувачів, якщо його немає
-    try:
-        cursor.execute("ALTER TABLE profiles ADD COLUMN email TEXT")
-    except sqlite3.OperationalError:
-        pass
-    # Оновлюємо hints та shuffles для користувачів, у яких вони NULL
-    cursor.execute("UPDATE profiles SET hints = 0 WHERE hints IS NULL")
-    cursor.execute("UPDATE profiles SET shuffles = 0 WHERE shuffles IS NULL")
-    cursor.execute("UPDATE profiles SET role = 'user' WHERE role IS NULL")
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS records (
-            id INTEGER PRIMARY KEY,
-            profile_id INTEGER NOT NULL,
-            timestamp TEXT NOT NULL,
-            duration INTEGER NOT NULL,
-            game_mode TEXT,
-            pattern_name TEXT,
-            FOREIGN KEY(profile_id) REFERENCES profiles(id)
+        # Додаємо поле coins для існуючих користувачів, якщо його немає
+        try:
+            cursor.execute("ALTER TABLE profiles ADD COLUMN coins INTEGER DEFAULT 10")
+        except sqlite3.OperationalError:
+            pass  # Колонка вже існує
+        # Оновлюємо coins для користувачів, у яких coins NULL
+        cursor.execute("UPDATE profiles SET coins = 10 WHERE coins IS NULL")
+        # Додаємо поля hints та shuffles для існуючих користувачів
+        try:
+            cursor.execute("ALTER TABLE profiles ADD COLUMN hints INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+        try:
+            cursor.execute("ALTER TABLE profiles ADD COLUMN shuffles INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+        # Додаємо поле role для існуючих користувачів, якщо його немає
+        try:
+            cursor.execute("ALTER TABLE profiles ADD COLUMN role TEXT DEFAULT 'user'")
+        except sqlite3.OperationalError:
+            pass
+        # Додаємо поле email для існуючих користувачів, якщо його немає
+        try:
+            cursor.execute("ALTER TABLE profiles ADD COLUMN email TEXT")
+        except sqlite3.OperationalError:
+            pass
+        # Оновлюємо hints та shuffles для користувачів, у яких вони NULL
+        cursor.execute("UPDATE profiles SET hints = 0 WHERE hints IS NULL")
+        cursor.execute("UPDATE profiles SET shuffles = 0 WHERE shuffles IS NULL")
+        cursor.execute("UPDATE profiles SET role = 'user' WHERE role IS NULL")
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY,
+                profile_id INTEGER NOT NULL,
+                timestamp TEXT NOT NULL,
+                duration INTEGER NOT NULL,
+                game_mode TEXT,
+                pattern_name TEXT,
+                FOREIGN KEY(profile_id) REFERENCES profiles(id)
+            )
+            """
         )
-        """
-    )
-    # Додаємо поле game_mode для існуючих записів, якщо його немає
-    try:
-        cursor.execute("ALTER TABLE records ADD COLUMN game_mode TEXT")
-    except sqlite3.OperationalError:
-        pass  # Колонка вже існує
-    # Додаємо поле pattern_name для існуючих записів, якщо його немає
-    try:
-        cursor.execute("ALTER TABLE records ADD COLUMN pattern_name TEXT")
-    except sqlite3.OperationalError:
-        pass  # Колонка вже існує
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY,
-            profile_id INTEGER NOT NULL,
-            start_time TEXT NOT NULL,
-            end_time TEXT,
-            result TEXT,
-            hints_used INTEGER,
-            shuffle_used INTEGER,
-            FOREIGN KEY(profile_id) REFERENCES profiles(id)
+        # Додаємо поле game_mode для існуючих записів, якщо його немає
+        try:
+            cursor.execute("ALTER TABLE records ADD COLUMN game_mode TEXT")
+        except sqlite3.OperationalError:
+            pass  # Колонка вже існує
+        # Додаємо поле pattern_name для існуючих записів, якщо його немає
+        try:
+            cursor.execute("ALTER TABLE records ADD COLUMN pattern_name TEXT")
+        except sqlite3.OperationalError:
+            pass  # Колонка вже існує
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                id INTEGER PRIMARY KEY,
+                profile_id INTEGER NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT,
+                result TEXT,
+                hints_used INTEGER,
+                shuffle_used INTEGER,
+                FOREIGN KEY(profile_id) REFERENCES profiles(id)
+            )
+            """
         )
-        """
-    )
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+        # Індекси для вибірок за профілем: кращий час і дата рекорду, останні рекорди, сесії рекорду
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_profile_dur ON records(profile_id, duration, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_records_profile_ts ON records(profile_id, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_profile_end ON sessions(profile_id, end_time, result)")
+        commit_db(conn)
 
 
 def _hash_password(password: str, salt: Optional[bytes] = None) -> Tuple[str, str]:
@@ -231,72 +359,91 @@ def _hash_password(password: str, salt: Optional[bytes] = None) -> Tuple[str, st
     return dk.hex(), salt.hex()
 
 
+# Кеш успішних перевірок паролів: (сіль, HMAC пароля) -> збережений хеш PBKDF2.
+# Повторні входи (запам'ятований користувач) не рахують 120000 ітерацій знову.
+# HMAC рахується з випадковим ключем процесу, тож записи кешу не можна
+# перебирати як швидкий хеш пароля; невдалі спроби в кеш не потрапляють
+_PASSWORD_CACHE_SECRET = secrets.token_bytes(32)
+_PASSWORD_HASH_CACHE: "OrderedDict[Tuple[bytes, bytes], str]" = OrderedDict()
+_PASSWORD_HASH_CACHE_LOCK = threading.Lock()
+PASSWORD_HASH_CACHE_SIZE = 64
+
+
+def _verify_password(password: str, salt_hex: str, stored_hash: str) -> bool:
+    """Перевіряє пароль за збереженими хешем і сіллю (з кешем успішних перевірок)"""
+    salt = bytes.fromhex(salt_hex)
+    cache_key = (salt, hmac.new(_PASSWORD_CACHE_SECRET, password.encode("utf-8"), hashlib.sha256).digest())
+    with _PASSWORD_HASH_CACHE_LOCK:
+        cached = _PASSWORD_HASH_CACHE.get(cache_key)
+        if cached is not None:
+            _PASSWORD_HASH_CACHE.move_to_end(cache_key)
+    # Після зміни пароля збережений хеш інший - кешований запис уже не підходить
+    if cached is not None and hmac.compare_digest(cached, stored_hash):
+        return True
+    candidate_hash, _ = _hash_password(password, salt)
+    if not hmac.compare_digest(candidate_hash, stored_hash):
+        return False
+    with _PASSWORD_HASH_CACHE_LOCK:
+        _PASSWORD_HASH_CACHE[cache_key] = stored_hash
+        _PASSWORD_HASH_CACHE.move_to_end(cache_key)
+        if len(_PASSWORD_HASH_CACHE) > PASSWORD_HASH_CACHE_SIZE:
+            _PASSWORD_HASH_CACHE.popitem(last=False)
+    return True
+
+
 def create_profile(username: str, password: str, email: Optional[str] = None) -> Optional[Dict]:
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    # PBKDF2 рахуємо до блокування бази
     password_hash, salt = _hash_password(password)
-    try:
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                INSERT INTO profiles (username, password_hash, salt, created_at, coins, hints, shuffles, role, email)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (username, password_hash, salt, _now_iso(), 10, 0, 0, "user", email),
+            )
+        except sqlite3.IntegrityError:
+            return None
+        profile_id = cursor.lastrowid
+        commit_db(conn)
+    return {"id": profile_id, "username": username, "role": "user"}
+
+
+def ensure_admin_profile():
+    """Гарантує наявність адміністративного облікового запису admin/admin."""
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM profiles WHERE username = ?", ("admin",))
+        row = cursor.fetchone()
+        if row:
+            return
+
+        # Створюємо адмінський профіль з роллю admin
+        password_hash, salt = _hash_password("admin")
         cursor.execute(
             """
             INSERT INTO profiles (username, password_hash, salt, created_at, coins, hints, shuffles, role, email)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (username, password_hash, salt, datetime.now().isoformat(), 10, 0, 0, "user", email),
+            ("admin", password_hash, salt, _now_iso(), 10, 0, 0, "admin", None),
         )
-    except sqlite3.IntegrityError:
-        conn.close()
-        save_encrypted_db(db_path)
-        return None
-    profile_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
-    return {"id": profile_id, "username": username, "role": "user"}
-
-
-def ensure_admin_profile():
-    """Гарантує наявність адміністративного облікового запису admin/admin."""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM profiles WHERE username = ?", ("admin",))
-    row = cursor.fetchone()
-    if row:
-        conn.close()
-        save_encrypted_db(db_path)
-        return
-
-    # Створюємо адмінський профіль з роллю admin
-    password_hash, salt = _hash_password("admin")
-    cursor.execute(
-        """
-        INSERT INTO profiles (username, password_hash, salt, created_at, coins, hints, shuffles, role, email)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        ("admin", password_hash, salt, datetime.now().isoformat(), 10, 0, 0, "admin", None),
-    )
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+        commit_db(conn)
 
 
 def authenticate(username: str, password: str) -> Optional[Dict]:
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, password_hash, salt, role FROM profiles WHERE username = ?",
-        (username,),
-    )
-    row = cursor.fetchone()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, password_hash, salt, role FROM profiles WHERE username = ?",
+            (username,),
+        )
+        row = cursor.fetchone()
     if not row:
         return None
     profile_id, stored_hash, salt_hex, role = row
-    candidate_hash, _ = _hash_password(password, bytes.fromhex(salt_hex))
-    if candidate_hash != stored_hash:
+    if not _verify_password(password, salt_hex, stored_hash):
         return None
     # Якщо роль з якоїсь причини None, вважаємо звичайним користувачем
     if role is None:
@@ -306,69 +453,62 @@ def authenticate(username: str, password: str) -> Optional[Dict]:
 
 def change_user_password(profile_id: int, old_password: str, new_password: str) -> bool:
     """Змінює пароль користувача, якщо старий пароль введено правильно."""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT password_hash, salt FROM profiles WHERE id = ?",
-        (profile_id,),
-    )
-    row = cursor.fetchone()
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT password_hash, salt FROM profiles WHERE id = ?",
+            (profile_id,),
+        )
+        row = cursor.fetchone()
     if not row:
-        conn.close()
-        save_encrypted_db(db_path)
         return False
+    # PBKDF2 (перевірка і новий хеш) рахуємо поза блокуванням бази
     stored_hash, salt_hex = row
-    candidate_hash, _ = _hash_password(old_password, bytes.fromhex(salt_hex))
-    if candidate_hash != stored_hash:
-        conn.close()
-        save_encrypted_db(db_path)
+    if not _verify_password(old_password, salt_hex, stored_hash):
         return False
-
-    # Оновлюємо пароль
     new_hash, new_salt = _hash_password(new_password)
-    cursor.execute(
-        "UPDATE profiles SET password_hash = ?, salt = ? WHERE id = ?",
-        (new_hash, new_salt, profile_id),
-    )
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+
+    # Оновлюємо пароль, лише якщо його не змінили паралельно
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE profiles SET password_hash = ?, salt = ? WHERE id = ? AND password_hash = ?",
+            (new_hash, new_salt, profile_id, stored_hash),
+        )
+        if cursor.rowcount != 1:
+            return False
+        commit_db(conn)
     return True
 
 
 def record_new_session(profile_id: int, result: str, hints_used: int, shuffle_used: int):
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """INSERT INTO sessions (profile_id, start_time, end_time, result, hints_used, shuffle_used)
-           VALUES (?, ?, ?, ?, ?, ?)""",
-        (
-            profile_id,
-            datetime.now().isoformat(),
-            datetime.now().isoformat(),
-            result,
-            hints_used,
-            shuffle_used,
-        ),
-    )
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        # Миттєва сесія: початок і кінець - один і той самий момент
+        now = _now_iso()
+        cursor.execute(
+            """INSERT INTO sessions (profile_id, start_time, end_time, result, hints_used, shuffle_used)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (
+                profile_id,
+                now,
+                now,
+                result,
+                hints_used,
+                shuffle_used,
+            ),
+        )
+        commit_db(conn)
 
 
 def fetch_profile_records(profile_id: int) -> List[dict]:
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT timestamp, duration FROM records WHERE profile_id = ? ORDER BY timestamp DESC LIMIT 5",
-        (profile_id,),
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT timestamp, duration FROM records WHERE profile_id = ? ORDER BY timestamp DESC LIMIT 5",
+            (profile_id,),
+        )
+        rows = cursor.fetchall()
     return [{"timestamp": r[0], "time": format_duration(r[1]), "duration": r[1]} for r in rows]
 
 
@@ -379,160 +519,140 @@ def insert_profile_record(
     game_mode: Optional[str] = None,
     pattern_name: Optional[str] = None,
 ):
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    if timestamp is None:
-        timestamp = datetime.now().isoformat()
-    cursor.execute(
-        "INSERT INTO records (profile_id, timestamp, duration, game_mode, pattern_name) VALUES (?, ?, ?, ?, ?)",
-        (profile_id, timestamp, duration, game_mode, pattern_name),
-    )
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        if timestamp is None:
+            timestamp = _now_iso()
+        cursor.execute(
+            "INSERT INTO records (profile_id, timestamp, duration, game_mode, pattern_name) VALUES (?, ?, ?, ?, ?)",
+            (profile_id, timestamp, duration, game_mode, pattern_name),
+        )
+        commit_db(conn)
 
 
 def get_user_coins(profile_id: int) -> int:
     """Отримує кількість монет користувача"""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT coins FROM profiles WHERE id = ?", (profile_id,))
-    row = cursor.fetchone()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT coins FROM profiles WHERE id = ?", (profile_id,))
+        row = cursor.fetchone()
     if row and row[0] is not None:
         return row[0]
     return 10  # Значення за замовчуванням
 
 def get_user_hints(profile_id: int) -> int:
     """Отримує кількість підказок користувача"""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT hints FROM profiles WHERE id = ?", (profile_id,))
-    row = cursor.fetchone()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT hints FROM profiles WHERE id = ?", (profile_id,))
+        row = cursor.fetchone()
     if row and row[0] is not None:
         return row[0]
     return 0
 
 def get_user_shuffles(profile_id: int) -> int:
     """Отримує кількість тасувань користувача"""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT shuffles FROM profiles WHERE id = ?", (profile_id,))
-    row = cursor.fetchone()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT shuffles FROM profiles WHERE id = ?", (profile_id,))
+        row = cursor.fetchone()
     if row and row[0] is not None:
         return row[0]
     return 0
 
 def update_user_coins(profile_id: int, coins: int):
     """Оновлює кількість монет користувача"""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE profiles SET coins = ? WHERE id = ?", (coins, profile_id))
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE profiles SET coins = ? WHERE id = ?", (coins, profile_id))
+        commit_db(conn)
 
 def update_user_hints(profile_id: int, hints: int):
     """Оновлює кількість підказок користувача"""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE profiles SET hints = ? WHERE id = ?", (hints, profile_id))
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE profiles SET hints = ? WHERE id = ?", (hints, profile_id))
+        commit_db(conn)
 
 def update_user_shuffles(profile_id: int, shuffles: int):
     """Оновлює кількість тасувань користувача"""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE profiles SET shuffles = ? WHERE id = ?", (shuffles, profile_id))
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE profiles SET shuffles = ? WHERE id = ?", (shuffles, profile_id))
+        commit_db(conn)
 
 def buy_hint(profile_id: int) -> bool:
     """Купує підказку за 1 coin. Повертає True якщо покупка успішна"""
-    coins = get_user_coins(profile_id)
-    if coins < 1:
-        return False
-    update_user_coins(profile_id, coins - 1)
-    hints = get_user_hints(profile_id)
-    update_user_hints(profile_id, hints + 1)
+    # Читання і запис монет - одна операція для інших сесій
+    with _DB_LOCK:
+        coins = get_user_coins(profile_id)
+        if coins < 1:
+            return False
+        update_user_coins(profile_id, coins - 1)
+        hints = get_user_hints(profile_id)
+        update_user_hints(profile_id, hints + 1)
     return True
 
 def buy_shuffle(profile_id: int) -> bool:
     """Купує тасування за 1 coin. Повертає True якщо покупка успішна"""
-    coins = get_user_coins(profile_id)
-    if coins < 1:
-        return False
-    update_user_coins(profile_id, coins - 1)
-    shuffles = get_user_shuffles(profile_id)
-    update_user_shuffles(profile_id, shuffles + 1)
+    # Читання і запис монет - одна операція для інших сесій
+    with _DB_LOCK:
+        coins = get_user_coins(profile_id)
+        if coins < 1:
+            return False
+        update_user_coins(profile_id, coins - 1)
+        shuffles = get_user_shuffles(profile_id)
+        update_user_shuffles(profile_id, shuffles + 1)
     return True
 
 def fetch_profile_stats(profile_id: int) -> Dict[str, Any]:
     """Повертає загальну статистику профілю та окремі кращі часи для Пасьянсу 1 і Пасьянсу 2."""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Загальна кількість ігор (усі режими)
-    cursor.execute(
-        "SELECT COUNT(*) FROM records WHERE profile_id = ?",
-        (profile_id,),
-    )
-    row = cursor.fetchone()
-    games = row[0] if row and row[0] is not None else 0
+    with db_transaction() as conn:
+        cursor = conn.cursor()
 
-    # Кращий час для Пасьянсу 1 (старі записи без game_mode вважаємо Пасьянсом 1)
-    cursor.execute(
-        "SELECT MIN(duration) FROM records WHERE profile_id = ? AND (game_mode = 'solitaire1' OR game_mode IS NULL)",
-        (profile_id,),
-    )
-    row = cursor.fetchone()
-    best_s1 = row[0] if row and row[0] is not None else None
+        # Загальна кількість ігор (усі режими)
+        cursor.execute(
+            "SELECT COUNT(*) FROM records WHERE profile_id = ?",
+            (profile_id,),
+        )
+        row = cursor.fetchone()
+        games = row[0] if row and row[0] is not None else 0
 
-    # Кращий час для Пасьянсу 2
-    cursor.execute(
-        "SELECT MIN(duration) FROM records WHERE profile_id = ? AND game_mode = 'solitaire2'",
-        (profile_id,),
-    )
-    row = cursor.fetchone()
-    best_s2 = row[0] if row and row[0] is not None else None
-
-    # Дата кращого рекорду (беремо дату найкращого з двох, для відображення в таблиці)
-    best_date = None
-    overall_best = None
-    if best_s1 is not None and best_s2 is not None:
-        overall_best = min(best_s1, best_s2)
-    elif best_s1 is not None:
-        overall_best = best_s1
-    elif best_s2 is not None:
-        overall_best = best_s2
-
-    if overall_best is not None:
+        # Кращий час для Пасьянсу 1 (старі записи без game_mode вважаємо Пасьянсом 1)
+        cursor.execute(
+            "SELECT MIN(duration) FROM records WHERE profile_id = ? AND (game_mode = 'solitaire1' OR game_mode IS NULL)",
+            (profile_id,),
+        )
+        row = cursor.fetchone()
+        best_s1 = row[0] if row and row[0] is not None else None
+
+        # Кращий час для Пасьянсу 2
         cursor.execute(
-            "SELECT timestamp FROM records WHERE profile_id = ? AND duration = ? ORDER BY timestamp DESC LIMIT 1",
-            (profile_id, overall_best),
+            "SELECT MIN(duration) FROM records WHERE profile_id = ? AND game_mode = 'solitaire2'",
+            (profile_id,),
         )
-        date_row = cursor.fetchone()
-        if date_row:
-            best_date = date_row[0]
+        row = cursor.fetchone()
+        best_s2 = row[0] if row and row[0] is not None else None
+
+        # Дата кращого рекорду (беремо дату найкращого з двох, для відображення в таблиці)
+        best_date = None
+        overall_best = None
+        if best_s1 is not None and best_s2 is not None:
+            overall_best = min(best_s1, best_s2)
+        elif best_s1 is not None:
+            overall_best = best_s1
+        elif best_s2 is not None:
+            overall_best = best_s2
+
+        if overall_best is not None:
+            cursor.execute(
+                "SELECT timestamp FROM records WHERE profile_id = ? AND duration = ? ORDER BY timestamp DESC LIMIT 1",
+                (profile_id, overall_best),
+            )
+            date_row = cursor.fetchone()
+            if date_row:
+                best_date = date_row[0]
 
-    conn.close()
-    save_encrypted_db(db_path)
 
     return {
         "games": games,
@@ -548,216 +668,127 @@ def fetch_pattern_best_time(
     """Повертає найкращий час для конкретного патерну та режиму, або None, якщо ігор не було."""
     if not pattern_name:
         return None
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT MIN(duration)
-        FROM records
-        WHERE profile_id = ?
-          AND game_mode = ?
-          AND pattern_name = ?
-        """,
-        (profile_id, game_mode, pattern_name),
-    )
-    row = cursor.fetchone()
-    best = row[0] if row and row[0] is not None else None
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT MIN(duration)
+            FROM records
+            WHERE profile_id = ?
+              AND game_mode = ?
+              AND pattern_name = ?
+            """,
+            (profile_id, game_mode, pattern_name),
+        )
+        row = cursor.fetchone()
+        best = row[0] if row and row[0] is not None else None
     return best
 
 
 def fetch_leaderboard(limit: int = 10) -> List[Dict[str, Any]]:
     """Отримує список користувачів з їхнім кращим часом та даними про підказки і тасування"""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Спочатку знаходимо найкращий час для кожного користувача
-    cursor.execute(
-        """
-        SELECT 
-            p.id,
-            p.username,
-            MIN(r.duration) AS best_time
-        FROM profiles p
-        LEFT JOIN records r ON p.id = r.profile_id
-        GROUP BY p.id, p.username
-        HAVING best_time IS NOT NULL
-        ORDER BY best_time ASC, p.username ASC
-        LIMIT ?
-        """,
-        (limit,),
-    )
-    rows = cursor.fetchall()
+    with db_transaction() as conn:
+        cursor = conn.cursor()
     
-    # Для кожного користувача знаходимо timestamp запису з найкращим часом та сесію
-    leaderboard: List[Dict[str, Any]] = []
-    for row in rows:
-        profile_id, username, best_time = row
-        hints_used = 0
-        shuffle_used = 0
-        
-        if best_time is not None:
-            # Знаходимо timestamp запису з найкращим часом
-            cursor.execute(
-                """
-                SELECT timestamp
-                FROM records
-                WHERE profile_id = ? 
-                  AND duration = ?
-                ORDER BY timestamp DESC
-                LIMIT 1
-                """,
-                (profile_id, best_time),
+        # Один запит замість окремих запитів на кожного користувача:
+        # best - кращий час, best_rec - timestamp найсвіжішого запису з цим часом,
+        # candidates - виграшні сесії, пов'язані з рекордом. Перевага сесії, що завершилась
+        # не далі 5 секунд від timestamp рекорду, інакше - сесії з найближчою тривалістю (±5 с)
+        cursor.execute(
+            """
+            WITH best AS (
+                SELECT p.id AS profile_id, p.username, MIN(r.duration) AS best_time
+                FROM profiles p
+                JOIN records r ON p.id = r.profile_id
+                GROUP BY p.id, p.username
+                ORDER BY best_time ASC, p.username ASC
+                LIMIT ?
+            ),
+            best_rec AS (
+                SELECT b.profile_id, b.username, b.best_time,
+                       (SELECT MAX(r.timestamp) FROM records r
+                        WHERE r.profile_id = b.profile_id AND r.duration = b.best_time) AS best_ts
+                FROM best b
+            ),
+            scored AS (
+                SELECT br.profile_id, s.id, s.hints_used, s.shuffle_used,
+                       ABS(julianday(s.end_time) - julianday(br.best_ts)) * 86400 AS ts_diff,
+                       ABS(CAST((julianday(s.end_time) - julianday(s.start_time)) * 86400 AS INTEGER) - br.best_time) AS dur_diff
+                FROM best_rec br
+                JOIN sessions s ON s.profile_id = br.profile_id
+                WHERE s.end_time IS NOT NULL
+                  AND (s.result = 'win' OR s.result = 'Виграш')
+            ),
+            candidates AS (
+                SELECT profile_id, hints_used, shuffle_used,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY profile_id
+                           ORDER BY CASE WHEN ts_diff <= 5 THEN 0 ELSE 1 END,
+                                    CASE WHEN ts_diff <= 5 THEN ts_diff ELSE dur_diff END,
+                                    id
+                       ) AS rn
+                FROM scored
+                WHERE ts_diff <= 5 OR dur_diff <= 5
             )
-            timestamp_row = cursor.fetchone()
-            best_time_timestamp = timestamp_row[0] if timestamp_row else None
-            
-            print(f"DEBUG fetch_leaderboard: profile_id={profile_id}, best_time={best_time}, timestamp={best_time_timestamp}")
-            
-            if best_time_timestamp:
-                # Знаходимо сесію, яка найближча за часом до timestamp запису з найкращим часом
-                # Дозволяємо різницю до 5 секунд через можливі округлення та затримки
-                # result може бути "Виграш" або "win"
-                cursor.execute(
-                    """
-                    SELECT hints_used, shuffle_used, end_time,
-                           CAST((julianday(end_time) - julianday(start_time)) * 86400 AS INTEGER) AS session_duration
-                    FROM sessions
-                    WHERE profile_id = ? 
-                      AND end_time IS NOT NULL 
-                      AND (result = 'win' OR result = 'Виграш')
-                      AND ABS(julianday(end_time) - julianday(?)) * 86400 <= 5
-                    ORDER BY ABS(julianday(end_time) - julianday(?)) ASC
-                    LIMIT 1
-                    """,
-                    (profile_id, best_time_timestamp, best_time_timestamp),
-                )
-                session_row = cursor.fetchone()
-                
-                # Якщо не знайшли за timestamp, шукаємо за duration
-                if not session_row:
-                    print(f"DEBUG fetch_leaderboard: Не знайдено сесію за timestamp для {username}, шукаю за duration")
-                    cursor.execute(
-                        """
-                        SELECT hints_used, shuffle_used, end_time,
-                               CAST((julianday(end_time) - julianday(start_time)) * 86400 AS INTEGER) AS session_duration
-                        FROM sessions
-                        WHERE profile_id = ? 
-                          AND end_time IS NOT NULL 
-                          AND (result = 'win' OR result = 'Виграш')
-                          AND ABS(CAST((julianday(end_time) - julianday(start_time)) * 86400 AS INTEGER) - ?) <= 5
-                        ORDER BY ABS(CAST((julianday(end_time) - julianday(start_time)) * 86400 AS INTEGER) - ?) ASC
-                        LIMIT 1
-                        """,
-                        (profile_id, best_time, best_time),
-                    )
-                    session_row = cursor.fetchone()
-            else:
-                # Якщо немає timestamp, знаходимо сесію з найближчим duration
-                cursor.execute(
-                    """
-                    SELECT hints_used, shuffle_used, end_time,
-                           CAST((julianday(end_time) - julianday(start_time)) * 86400 AS INTEGER) AS session_duration
-                    FROM sessions
-                    WHERE profile_id = ? 
-                      AND end_time IS NOT NULL 
-                      AND (result = 'win' OR result = 'Виграш')
-                      AND ABS(CAST((julianday(end_time) - julianday(start_time)) * 86400 AS INTEGER) - ?) <= 5
-                    ORDER BY ABS(CAST((julianday(end_time) - julianday(start_time)) * 86400 AS INTEGER) - ?) ASC
-                    LIMIT 1
-                    """,
-                    (profile_id, best_time, best_time),
-                )
-                session_row = cursor.fetchone()
-            
-            if session_row:
-                hints_used = session_row[0] if session_row[0] is not None else 0
-                shuffle_used = session_row[1] if session_row[1] is not None else 0
-                session_end_time = session_row[2] if len(session_row) > 2 else None
-                session_duration = session_row[3] if len(session_row) > 3 else None
-                print(f"DEBUG fetch_leaderboard: Знайдено сесію для {username}: hints={hints_used}, shuffle={shuffle_used}, end_time={session_end_time}, duration={session_duration}")
-            else:
-                print(f"DEBUG fetch_leaderboard: Сесія не знайдена для {username} з best_time={best_time}, timestamp={best_time_timestamp}")
-                # Додаткова діагностика - показуємо всі сесії для цього користувача
-                cursor.execute(
-                    """
-                    SELECT id, hints_used, shuffle_used, end_time, result,
-                           CAST((julianday(end_time) - julianday(start_time)) * 86400 AS INTEGER) AS session_duration
-                    FROM sessions
-                    WHERE profile_id = ? 
-                      AND end_time IS NOT NULL 
-                    ORDER BY end_time DESC
-                    LIMIT 5
-                    """,
-                    (profile_id,),
-                )
-                all_sessions = cursor.fetchall()
-                print(f"DEBUG fetch_leaderboard: Всі сесії для {username}: {all_sessions}")
-        
-        leaderboard.append(
+            SELECT br.username, br.best_time,
+                   COALESCE(c.hints_used, 0), COALESCE(c.shuffle_used, 0)
+            FROM best_rec br
+            LEFT JOIN candidates c ON c.profile_id = br.profile_id AND c.rn = 1
+            ORDER BY br.best_time ASC, br.username ASC
+            """,
+            (limit,),
+        )
+        leaderboard: List[Dict[str, Any]] = [
             {
                 "username": username,
                 "best_time": best_time,
                 "hints_used": hints_used,
                 "shuffle_used": shuffle_used,
             }
-        )
+            for username, best_time, hints_used, shuffle_used in cursor.fetchall()
+        ]
     
-    conn.close()
-    save_encrypted_db(db_path)
-    print(f"DEBUG fetch_leaderboard: Повернуто {len(leaderboard)} користувачів")
-    for entry in leaderboard:
-        print(f"DEBUG fetch_leaderboard: {entry['username']} - {entry['best_time']}, hints={entry['hints_used']}, shuffle={entry['shuffle_used']}")
     return leaderboard
 
 def start_session(profile_id: int) -> int:
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO sessions (profile_id, start_time)
-        VALUES (?, ?)
-        """,
-        (profile_id, datetime.now().isoformat()),
-    )
-    session_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO sessions (profile_id, start_time)
+            VALUES (?, ?)
+            """,
+            (profile_id, _now_iso()),
+        )
+        session_id = cursor.lastrowid
+        commit_db(conn)
     return session_id
 
 
 def end_session(session_id: int, result: str, hints_used: int, shuffle_used: int) -> str:
     """Завершує сесію і повертає end_time"""
-    db_path = load_encrypted_db()
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    end_time = datetime.now().isoformat()
-    cursor.execute(
-        """
-        UPDATE sessions
-        SET
-            end_time = ?,
-            result = ?,
-            hints_used = ?,
-            shuffle_used = ?
-        WHERE id = ?
-        """,
-        (
-            end_time,
-            result,
-            hints_used,
-            shuffle_used,
-            session_id,
-        ),
-    )
-    conn.commit()
-    conn.close()
-    save_encrypted_db(db_path)
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        end_time = _now_iso()
+        cursor.execute(
+            """
+            UPDATE sessions
+            SET
+                end_time = ?,
+                result = ?,
+                hints_used = ?,
+                shuffle_used = ?
+            WHERE id = ?
+            """,
+            (
+                end_time,
+                result,
+                hints_used,
+                shuffle_used,
+                session_id,
+            ),
+        )
+        commit_db(conn)
     return end_time
 
 
@@ -819,6 +850,26 @@ class TileType(Enum):
     SEASON_WINTER = "season_winter"
 
 
+# Короткі назви плиток для відображення
+_DISPLAY_NAMES: Dict[TileType, str] = {
+    TileType.BAMBOO_1: "1B", TileType.BAMBOO_2: "2B", TileType.BAMBOO_3: "3B",
+    TileType.BAMBOO_4: "4B", TileType.BAMBOO_5: "5B", TileType.BAMBOO_6: "6B",
+    TileType.BAMBOO_7: "7B", TileType.BAMBOO_8: "8B", TileType.BAMBOO_9: "9B",
+    TileType.DOT_1: "1D", TileType.DOT_2: "2D", TileType.DOT_3: "3D",
+    TileType.DOT_4: "4D", TileType.DOT_5: "5D", TileType.DOT_6: "6D",
+    TileType.DOT_7: "7D", TileType.DOT_8: "8D", TileType.DOT_9: "9D",
+    TileType.WAN_1: "1W", TileType.WAN_2: "2W", TileType.WAN_3: "3W",
+    TileType.WAN_4: "4W", TileType.WAN_5: "5W", TileType.WAN_6: "6W",
+    TileType.WAN_7: "7W", TileType.WAN_8: "8W", TileType.WAN_9: "9W",
+    TileType.EAST: "東", TileType.SOUTH: "南", TileType.WEST: "西", TileType.NORTH: "北",
+    TileType.RED_DRAGON: "中", TileType.GREEN_DRAGON: "發", TileType.WHITE_DRAGON: "白",
+    TileType.FLOWER_PLUM: "梅", TileType.FLOWER_ORCHID: "蘭", 
+    TileType.FLOWER_CHRYSANTHEMUM: "菊", TileType.FLOWER_BAMBOO: "竹",
+    TileType.SEASON_SPRING: "春", TileType.SEASON_SUMMER: "夏",
+    TileType.SEASON_AUTUMN: "秋", TileType.SEASON_WINTER: "冬",
+}
+
+
 class Tile:
     """Клас для представлення однієї плитки"""
     
@@ -832,32 +883,26 @@ class Tile:
         self.highlighted = False
         self.ui_element: Optional[ft.Container] = None
         
+    def same_type(self, other: "Tile") -> bool:
+        """Чи однакового типу дві плитки (умова для пари)"""
+        return self.tile_type == other.tile_type
+    
     def __eq__(self, other):
         """Дві плитки рівні, якщо вони одного типу"""
         if not isinstance(other, Tile):
             return False
-        return self.tile_type == other.tile_type
+        return self.same_type(other)
+    
+    # __eq__ порівнює типи, але в множинах і словниках плитка - це конкретний об'єкт
+    __hash__ = object.__hash__
     
     def get_display_name(self) -> str:
         """Повертає назву для відображення"""
-        name_map = {
-            TileType.BAMBOO_1: "1B", TileType.BAMBOO_2: "2B", TileType.BAMBOO_3: "3B",
-            TileType.BAMBOO_4: "4B", TileType.BAMBOO_5: "5B", TileType.BAMBOO_6: "6B",
-            TileType.BAMBOO_7: "7B", TileType.BAMBOO_8: "8B", TileType.BAMBOO_9: "9B",
-            TileType.DOT_1: "1D", TileType.DOT_2: "2D", TileType.DOT_3: "3D",
-            TileType.DOT_4: "4D", TileType.DOT_5: "5D", TileType.DOT_6: "6D",
-            TileType.DOT_7: "7D", TileType.DOT_8: "8D", TileType.DOT_9: "9D",
-            TileType.WAN_1: "1W", TileType.WAN_2: "2W", TileType.WAN_3: "3W",
-            TileType.WAN_4: "4W", TileType.WAN_5: "5W", TileType.WAN_6: "6W",
-            TileType.WAN_7: "7W", TileType.WAN_8: "8W", TileType.WAN_9: "9W",
-            TileType.EAST: "東", TileType.SOUTH: "南", TileType.WEST: "西", TileType.NORTH: "北",
-            TileType.RED_DRAGON: "中", TileType.GREEN_DRAGON: "發", TileType.WHITE_DRAGON: "白",
-            TileType.FLOWER_PLUM: "梅", TileType.FLOWER_ORCHID: "蘭", 
-            TileType.FLOWER_CHRYSANTHEMUM: "菊", TileType.FLOWER_BAMBOO: "竹",
-            TileType.SEASON_SPRING: "春", TileType.SEASON_SUMMER: "夏",
-            TileType.SEASON_AUTUMN: "秋", TileType.SEASON_WINTER: "冬",
-        }
-        return name_map.get(self.tile_type, "?")
+        return _DISPLAY_NAMES.get(self.tile_type, "?")
+
+
+# Стандартний патерн: один суцільний шар 20x10 (лише читається, спільний для всіх дошок)
+_DEFAULT_PATTERN: List[List[List[bool]]] = [[[True] * 20 for _ in range(10)]]
 
 
 class Board:
@@ -887,6 +932,15 @@ class Board:
             TileType.FLOWER_PLUM, TileType.FLOWER_ORCHID, TileType.FLOWER_CHRYSANTHEMUM, TileType.FLOWER_BAMBOO,
             TileType.SEASON_SPRING, TileType.SEASON_SUMMER, TileType.SEASON_AUTUMN, TileType.SEASON_WINTER,
         ]
+        # Версія розкладу: збільшується при новому розміщенні плиток та тасуванні типів.
+        # Разом із прапорцями removed утворює ключ кешів доступних плиток і ходів
+        self._version = 0
+        self._avail_cache: Tuple[Optional[tuple], List[Tile]] = (None, [])
+        self._moves_cache: Tuple[Optional[tuple], bool] = (None, False)
+        # Кеші can_connect для поточного стану: результати пар та зайняті клітинки для кожного типу
+        self._connect_state: Optional[tuple] = None
+        self._connect_cache: Dict[Tuple[int, int, int], bool] = {}
+        self._occupied_by_type: Dict[TileType, bytearray] = {}
         self.generate_board()
         
     def generate_board(self):
@@ -894,18 +948,22 @@ class Board:
         global game_mode
         pattern = self._create_pyramid_pattern()
         
-        # Підраховуємо кількість місць для тейлів у патерні
-        total_tile_positions = 0
-        for layer in pattern:
-            for row in layer:
-                total_tile_positions += sum(1 for cell in row if cell)
+        # Позиції місць для тейлів у порядку (z, y, x) - однакові для всіх спроб
+        positions = [
+            (x, y, z)
+            for z, layer in enumerate(pattern)
+            for y, row in enumerate(layer)
+            for x, has_tile in enumerate(row)
+            if has_tile
+        ]
+        total_tile_positions = len(positions)
         
         if game_mode == "solitaire2":
             # Для Пасьянс 2 використовуємо кількість з патерну
             # Якщо кількість непарна, додаємо один тейл для пари
             if total_tile_positions % 2 != 0:
                 total_tile_positions += 1
-                print(f"DEBUG generate_board: Кількість тейлів непарна, додано один тейл. Тепер: {total_tile_positions}")
+                logger.debug("generate_board: Кількість тейлів непарна, додано один тейл. Тепер: %s", total_tile_positions)
             
             pair_count = total_tile_positions // 2
         else:
@@ -913,42 +971,40 @@ class Board:
             pair_count = 100
         
         pair_choices = [random.choice(self.basic_tile_types) for _ in range(pair_count)]
-        tiles = []
-        for tile_type in pair_choices:
-            tiles.extend([tile_type] * 2)
+        # Кожен тип двічі поспіль: заповнюємо парні й непарні позиції зрізами, без списку на кожну пару
+        tiles = pair_choices * 2
+        tiles[::2] = pair_choices
+        tiles[1::2] = pair_choices
+
+        # Розміри поля потрібні can_connect вже під час перевірки спроб
+        if pattern and pattern[0]:
+            self.width = len(pattern[0][0])
+            self.height = len(pattern[0])
 
         max_attempts = 10
         self.game_over = False
         for attempt in range(max_attempts):
-            self.tiles = []
             board_tiles = tiles.copy()
             random.shuffle(board_tiles)
             
             # Логування для діагностики (тільки для першої спроби)
             if attempt == 0:
-                print(f"DEBUG generate_board: game_mode={game_mode}, pattern layers={len(pattern)}")
+                logger.debug("generate_board: game_mode=%s, pattern layers=%s", game_mode, len(pattern))
                 for z, layer in enumerate(pattern):
                     tile_count = sum(sum(1 for cell in row if cell) for row in layer)
-                    print(f"DEBUG generate_board: Шар {z}: {len(layer)} рядків, {tile_count} тейлів")
+                    logger.debug("generate_board: Шар %s: %s рядків, %s тейлів", z, len(layer), tile_count)
             
-            tile_index = 0
-            for z, layer in enumerate(pattern):
-                for y, row in enumerate(layer):
-                    for x, has_tile in enumerate(row):
-                        if has_tile and tile_index < len(board_tiles):
-                            self.tiles.append(Tile(board_tiles[tile_index], x, y, z))
-                            tile_index += 1
+            self.tiles = [Tile(tile_type, x, y, z) for tile_type, (x, y, z) in zip(board_tiles, positions)]
+            self._build_position_index()
             
             # Логування після розміщення (тільки для першої спроби)
             if attempt == 0:
                 tiles_by_z = {}
                 for tile in self.tiles:
                     tiles_by_z[tile.z] = tiles_by_z.get(tile.z, 0) + 1
-                print(f"DEBUG generate_board: Розміщено тейлів по рівнях: {tiles_by_z}")
+                logger.debug("generate_board: Розміщено тейлів по рівнях: %s", tiles_by_z)
 
             if not self.is_game_lost():
-                self.width = len(pattern[0][0])
-                self.height = len(pattern[0])
                 return
 
         print("WARNING: Не вдалося згенерувати дошку з ходом за", max_attempts, "спроб")
@@ -972,18 +1028,10 @@ class Board:
             if saved_pattern:
                 return saved_pattern
             # Якщо немає збережених патернів, використовуємо стандартний патерн (один шар)
-            layer0 = []
-            for y in range(10):
-                row = [True] * 20
-                layer0.append(row)
-            return [layer0]
+            return _DEFAULT_PATTERN
         else:
             # Для інших режимів - один шар
-            layer0 = []
-            for y in range(10):
-                row = [True] * 20
-                layer0.append(row)
-            return [layer0]
+            return _DEFAULT_PATTERN
     
     def _load_random_saved_pattern(self, pattern_name: Optional[str] = None, game_mode_filter: Optional[str] = None) -> Optional[List[List[List[bool]]]]:
         """Завантажує збережений патерн. Якщо pattern_name вказано, завантажує конкретний патерн, інакше - випадковий.
@@ -1032,7 +1080,7 @@ class Board:
                     break
             
             if not pattern_file:
-                print(f"DEBUG _load_random_saved_pattern: Патерн '{pattern_name}' не знайдено серед відфільтрованих патернів")
+                logger.debug("_load_random_saved_pattern: Патерн '%s' не знайдено серед відфільтрованих патернів", pattern_name)
                 return None
         else:
             # Вибираємо випадковий файл з відфільтрованих
@@ -1043,7 +1091,7 @@ class Board:
             
             # Перевіряємо структуру даних
             if "layers" not in pattern_data:
-                print(f"DEBUG _load_random_saved_pattern: Некоректний формат файлу {pattern_file}")
+                logger.debug("_load_random_saved_pattern: Некоректний формат файлу %s", pattern_file)
                 return None
             
             # Конвертуємо патерн у формат List[List[List[bool]]]
@@ -1057,10 +1105,10 @@ class Board:
                     converted_layer.append(converted_row)
                 converted_layers.append(converted_layer)
             
-            print(f"DEBUG _load_random_saved_pattern: Завантажено патерн '{pattern_data.get('name', 'unknown')}' з {len(converted_layers)} шарами")
+            logger.debug("_load_random_saved_pattern: Завантажено патерн '%s' з %s шарами", pattern_data.get('name', 'unknown'), len(converted_layers))
             return converted_layers
         except Exception as e:
-            print(f"DEBUG _load_random_saved_pattern: Помилка завантаження {pattern_file}: {e}")
+            logger.debug("_load_random_saved_pattern: Помилка завантаження %s: %s", pattern_file, e)
             return None
     
     def _create_turtle_pattern(self) -> List[List[List[bool]]]:
@@ -1119,6 +1167,17 @@ class Board:
         
         return pattern
     
+    def _build_position_index(self):
+        """Будує індекс позицій плиток: (x, y, z) -> плитка та (x, y) -> стовпчик плиток.
+        Координати плиток не змінюються після генерації, тому індекс містить і видалені
+        плитки - під час пошуку вони відкидаються за прапорцем removed"""
+        self.by_pos: Dict[Tuple[int, int, int], Tile] = {}
+        self.by_column: Dict[Tuple[int, int], List[Tile]] = {}
+        self._version += 1
+        for tile in self.tiles:
+            self.by_pos[(tile.x, tile.y, tile.z)] = tile
+            self.by_column.setdefault((tile.x, tile.y), []).append(tile)
+    
     def is_tile_available(self, tile: Tile) -> bool:
         """Перевіряє, чи плитка доступна"""
         global game_mode
@@ -1126,26 +1185,23 @@ class Board:
         if tile.removed:
             return False
         
+        # Перевіряємо, чи немає плиток зверху (на тому ж x, y, але вищий z)
+        for other_tile in self.by_column.get((tile.x, tile.y), ()):
+            if other_tile.z > tile.z and not other_tile.removed:
+                return False
+        
+        def neighbor(dx: int, dy: int) -> Optional[Tile]:
+            other_tile = self.by_pos.get((tile.x + dx, tile.y + dy, tile.z))
+            if other_tile is None or other_tile is tile or other_tile.removed:
+                return None
+            return other_tile
+        
+        def has_neighbor(dx: int, dy: int) -> bool:
+            return neighbor(dx, dy) is not None
+        
         # Для Пасьянс-2: тейл доступний, якщо він відкритий зліва АБО справа (або з обох сторін)
         if game_mode == "solitaire2":
-            # Перевіряємо, чи немає плиток зверху (на тому ж x, y, але вищий z)
-            for other_tile in self.tiles:
-                if other_tile.removed:
-                    continue
-                if other_tile.x == tile.x and other_tile.y == tile.y and other_tile.z > tile.z:
-                    return False
-            
             # Перевіряємо ліву та праву сторони
-            def has_neighbor(dx: int, dy: int) -> bool:
-                return any(
-                    other_tile is not tile
-                    and not other_tile.removed
-                    and other_tile.z == tile.z
-                    and other_tile.x == tile.x + dx
-                    and other_tile.y == tile.y + dy
-                    for other_tile in self.tiles
-                )
-            
             left_blocked = has_neighbor(-1, 0)  # Зліва
             right_blocked = has_neighbor(1, 0)  # Справа
             
@@ -1154,103 +1210,126 @@ class Board:
             return not (left_blocked and right_blocked)
         
         # Для Пасьянс-1 та інших режимів - стандартна логіка
-        # Перевіряємо, чи немає плиток зверху (на тому ж x, y, але вищий z)
-        for other_tile in self.tiles:
-            if other_tile.removed:
-                continue
-            if other_tile.x == tile.x and other_tile.y == tile.y and other_tile.z > tile.z:
-                return False
-        
-        def has_neighbor(dx: int, dy: int) -> bool:
-            return any(
-                other_tile is not tile
-                and not other_tile.removed
-                and other_tile.z == tile.z
-                and other_tile.x == tile.x + dx
-                and other_tile.y == tile.y + dy
-                for other_tile in self.tiles
-            )
-
         directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
         # Якщо бодай один напрямок вільний — плитка доступна
         if any(not has_neighbor(dx, dy) for dx, dy in directions):
             return True
 
         def has_adjacent_same_type(dx: int, dy: int) -> bool:
-            return any(
-                other_tile is not tile
-                and not other_tile.removed
-                and other_tile.tile_type == tile.tile_type
-                and other_tile.z == tile.z
-                and other_tile.x == tile.x + dx
-                and other_tile.y == tile.y + dy
-                for other_tile in self.tiles
-            )
+            other_tile = neighbor(dx, dy)
+            return other_tile is not None and other_tile.same_type(tile)
 
         # Якщо поруч є плитка того ж типу — теж доступна
         return any(has_adjacent_same_type(dx, dy) for dx, dy in directions)
 
     def can_connect(self, tile1: Tile, tile2: Tile, max_turns: int = 2) -> bool:
         """Перевіряє, чи можна з’єднати дві плитки шляхом з <= max_turns поворотів"""
-        if tile1 is tile2 or tile1.tile_type != tile2.tile_type:
+        if tile1 is tile2 or not tile1.same_type(tile2):
             return False
 
-        occupied = {
-            (t.x, t.y)
-            for t in self.tiles
-            if not t.removed and t not in (tile1, tile2)
-        }
-
-        start = (tile1.x, tile1.y)
+        state = self._state_key()
+        if state != self._connect_state:
+            self._connect_state = state
+            self._connect_cache.clear()
+            self._occupied_by_type.clear()
+        # Шлях симетричний, тож порядок плиток у ключі не важливий
+        cache_key = (min(id(tile1), id(tile2)), max(id(tile1), id(tile2)), max_turns)
+        cached = self._connect_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        result = self._find_connection(tile1, tile2, max_turns)
+        self._connect_cache[cache_key] = result
+        return result
+
+    def _blocked_for_type(self, tile_type: TileType) -> bytearray:
+        """Маска клітинок поля з рамкою в одну клітинку, зайнятих живими плитками іншого типу
+        (плитки того ж типу не заважають шляху). Індекс клітинки: (y + 1) * (width + 2) + x + 1"""
+        blocked = self._occupied_by_type.get(tile_type)
+        if blocked is None:
+            stride = self.width + 2
+            blocked = bytearray(stride * (self.height + 2))
+            for t in self.tiles:
+                if (not t.removed and t.tile_type != tile_type
+                        and 0 <= t.x < self.width and 0 <= t.y < self.height):
+                    blocked[(t.y + 1) * stride + t.x + 1] = 1
+            self._occupied_by_type[tile_type] = blocked
+        return blocked
+
+    def _find_connection(self, tile1: Tile, tile2: Tile, max_turns: int) -> bool:
+        """Пошук шляху в ширину між двома плитками одного типу"""
         dest = (tile2.x, tile2.y)
-        directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
-        queue = deque([(start[0], start[1], None, 0)])
-        seen = {(start[0], start[1], None): 0}
+        if (tile1.x, tile1.y) == dest:
+            return True
 
-        def is_free(x: int, y: int) -> bool:
-            if (x, y) == dest:
-                return True
-            if x < -1 or x > self.width or y < -1 or y > self.height:
-                return False
-            if x < 0 or x >= self.width or y < 0 or y >= self.height:
-                return True
-            return (x, y) not in occupied
+        width, height = self.width, self.height
+        stride = width + 2
+        plane = stride * (height + 2)
+        blocked = self._blocked_for_type(tile1.tile_type)
+        # Найменша кількість поворотів для кожної пари (напрямок, клітинка) у плоскому списку
+        # замість словника з кортежними ключами; max_turns + 1 означає "ще не відвідано"
+        seen = [max_turns + 1] * (4 * plane)
+        directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+        queue = deque([(tile1.x, tile1.y, -1, 0)])
 
         while queue:
             x, y, direction, turns = queue.popleft()
-            if (x, y) == dest and turns <= max_turns:
-                return True
-
             for dir_idx, (dx, dy) in enumerate(directions):
                 nx, ny = x + dx, y + dy
-                next_turns = turns + (0 if direction == dir_idx or direction is None else 1)
-                if next_turns > max_turns or not is_free(nx, ny):
+                next_turns = turns if direction == dir_idx or direction < 0 else turns + 1
+                if next_turns > max_turns:
+                    continue
+                if (nx, ny) == dest:
+                    return True
+                # За межами поля можна пройти лише по рамці шириною в одну клітинку
+                if nx < -1 or nx > width or ny < -1 or ny > height:
                     continue
-                state = (nx, ny, dir_idx)
-                prev_turns = seen.get(state)
-                if prev_turns is not None and prev_turns <= next_turns:
+                cell = (ny + 1) * stride + nx + 1
+                if blocked[cell]:
                     continue
-                seen[state] = next_turns
+                index = dir_idx * plane + cell
+                if seen[index] <= next_turns:
+                    continue
+                seen[index] = next_turns
                 queue.append((nx, ny, dir_idx, next_turns))
 
         return False
     
+    def _state_key(self) -> tuple:
+        """Ключ поточного стану дошки. Плитки прибираються й повертаються також поза Board
+        (комірки Пасьянсу 2, відміна ходу), тому враховуємо самі прапорці removed"""
+        return (self._version, tuple(tile.removed for tile in self.tiles))
+    
     def get_available_tiles(self) -> List[Tile]:
-        """Повертає список доступних плиток"""
-        return [tile for tile in self.tiles if self.is_tile_available(tile)]
+        """Повертає список доступних плиток (кешується до зміни стану дошки)"""
+        state = self._state_key()
+        if self._avail_cache[0] != state:
+            self._avail_cache = (state, [tile for tile in self.tiles if self.is_tile_available(tile)])
+        return self._avail_cache[1]
     
     def clear_highlights(self):
         """Скидає стан підсвічування плиток"""
         for tile in self.tiles:
             tile.highlighted = False
 
+    @staticmethod
+    def _same_type_pairs(available: List[Tile]):
+        """Перебирає пари доступних плиток одного типу в тому ж порядку, що й повний перебір пар"""
+        groups: Dict[TileType, List[Tile]] = {}
+        for tile in available:
+            groups.setdefault(tile.tile_type, []).append(tile)
+        # Позиція кожної плитки у своїй групі: пара береться лише з плитками після неї
+        positions: Dict[TileType, int] = {}
+        for tile1 in available:
+            pos = positions.get(tile1.tile_type, 0) + 1
+            positions[tile1.tile_type] = pos
+            for tile2 in groups[tile1.tile_type][pos:]:
+                yield tile1, tile2
+
     def find_hint_pair(self) -> Optional[Tuple[Tile, Tile]]:
         """Повертає першу пару плиток, яку можна з’єднати"""
-        available = self.get_available_tiles()
-        for i, tile1 in enumerate(available):
-            for tile2 in available[i + 1 :]:
-                if tile1 == tile2 and self.can_connect(tile1, tile2):
-                    return tile1, tile2
+        for tile1, tile2 in self._same_type_pairs(self.get_available_tiles()):
+            if self.can_connect(tile1, tile2):
+                return tile1, tile2
         return None
     
     def click_tile(self, tile: Tile):
@@ -1277,14 +1356,14 @@ class Board:
                 # Скасовуємо вибір, якщо клікнули на той самий тейл
                 self.selected_tile.selected = False
                 self.selected_tile = None
-            elif self.selected_tile.tile_type == tile.tile_type:
+            elif self.selected_tile.same_type(tile):
                 # Знайдено однакові тейли - перевіряємо, чи можна їх видалити
                 selected_available = self.is_tile_available(self.selected_tile)
                 clicked_available = self.is_tile_available(tile)
                 can_connect_result = self.can_connect(self.selected_tile, tile)
-                print(f"DEBUG click_tile solitaire1: selected_tile=({self.selected_tile.x},{self.selected_tile.y},{self.selected_tile.z}), tile_type={self.selected_tile.tile_type}")
-                print(f"DEBUG click_tile solitaire1: clicked_tile=({tile.x},{tile.y},{tile.z}), tile_type={tile.tile_type}")
-                print(f"DEBUG click_tile solitaire1: selected_available={selected_available}, clicked_available={clicked_available}, can_connect={can_connect_result}")
+                logger.debug("click_tile solitaire1: selected_tile=(%s,%s,%s), tile_type=%s", self.selected_tile.x, self.selected_tile.y, self.selected_tile.z, self.selected_tile.tile_type)
+                logger.debug("click_tile solitaire1: clicked_tile=(%s,%s,%s), tile_type=%s", tile.x, tile.y, tile.z, tile.tile_type)
+                logger.debug("click_tile solitaire1: selected_available=%s, clicked_available=%s, can_connect=%s", selected_available, clicked_available, can_connect_result)
                 if (
                     selected_available
                     and clicked_available
@@ -1296,7 +1375,7 @@ class Board:
                     self.selected_tile = None
                 else:
                     # Якщо не можна з'єднати, вибираємо новий тейл
-                    print(f"DEBUG click_tile solitaire1: Не можна видалити пару - selected_available={selected_available}, clicked_available={clicked_available}, can_connect={can_connect_result}")
+                    logger.debug("click_tile solitaire1: Не можна видалити пару - selected_available=%s, clicked_available=%s, can_connect=%s", selected_available, clicked_available, can_connect_result)
                     self.selected_tile.selected = False
                     self.selected_tile = tile
                     tile.selected = True
@@ -1313,14 +1392,17 @@ class Board:
     
     def has_possible_moves(self) -> bool:
         """Чи є хоча б одна пара, яку можна з’єднати з <= max_turns поворотів"""
+        state = self._state_key()
+        if self._moves_cache[0] == state:
+            return self._moves_cache[1]
         available = self.get_available_tiles()
-        if len(available) < 2:
-            return False
-        for i, tile1 in enumerate(available):
-            for tile2 in available[i + 1 :]:
-                if tile1 == tile2 and self.can_connect(tile1, tile2):
-                    return True
-        return False
+        result = False
+        if len(available) >= 2:
+            result = any(
+                self.can_connect(tile1, tile2) for tile1, tile2 in self._same_type_pairs(available)
+            )
+        self._moves_cache = (state, result)
+        return result
 
     def reshuffle_remaining_tiles(self):
         """Перемішує типи плиток, залишаючи пусті клітинки порожніми"""
@@ -1330,15 +1412,16 @@ class Board:
         random.shuffle(remaining)
         pair_count = len(remaining) // 2
         pair_choices = [random.choice(self.basic_tile_types) for _ in range(pair_count)]
-        tiles_pool: List[TileType] = []
-        for tile_type in pair_choices:
-            tiles_pool.extend([tile_type, tile_type])
+        tiles_pool: List[TileType] = pair_choices * 2
+        tiles_pool[::2] = pair_choices
+        tiles_pool[1::2] = pair_choices
         random.shuffle(tiles_pool)
 
         for tile, tile_type in zip(remaining, tiles_pool):
             tile.tile_type = tile_type
             tile.selected = False
             tile.highlighted = False
+        self._version += 1
         self.selected_tile = None
         self.game_over = False
     
@@ -1351,22 +1434,96 @@ class Board:
         return not self.has_possible_moves()
 
 
-def main(page: ft.Page):
-    """Головна функція Flet додатку"""
-    page.title = "Mahjong Solitaire"
-    # Встановлюємо розмір вікна, щоб поміщалося на більшості моніторів
-    page.window.width = 1400
-    page.window.height = 790  # Збільшено висоту на 30 пікселів, щоб прибрати скрол
-    page.bgcolor = BACKGROUND_COLOR
-    page.scroll = ft.ScrollMode.HIDDEN  # Прибрано скрол - висота статична
-    page.padding = 0  # Прибрано padding, щоб не було пустого поля
-    
-    initialize_db()
-    # Гарантуємо наявність облікового запису адміністратора (admin/admin)
-    ensure_admin_profile()
-    board = Board()
-    
-    # Завантаження зображень плиток
+# Ім'я файлу зображення (в нижньому регістрі) для кожного типу плитки - незмінні константи
+# Нові назви файлів у папці fulltiles (3D тейли)
+_TILE_FILENAMES_3D: Mapping[TileType, str] = MappingProxyType({
+    TileType.BAMBOO_1: "bamboo1.png",
+    TileType.BAMBOO_2: "bamboo2.png",
+    TileType.BAMBOO_3: "bamboo3.png",
+    TileType.BAMBOO_4: "bamboo4.png",
+    TileType.BAMBOO_5: "bamboo5.png",
+    TileType.BAMBOO_6: "bamboo6.png",
+    TileType.BAMBOO_7: "bamboo7.png",
+    TileType.BAMBOO_8: "bamboo8.png",
+    TileType.BAMBOO_9: "bamboo9.png",
+    TileType.DOT_1: "circle1.png",
+    TileType.DOT_2: "circle2.png",
+    TileType.DOT_3: "circle3.png",
+    TileType.DOT_4: "circle4.png",
+    TileType.DOT_5: "circle5.png",
+    TileType.DOT_6: "circle6.png",
+    TileType.DOT_7: "circle7.png",
+    TileType.DOT_8: "circle8.png",
+    TileType.DOT_9: "circle9.png",
+    TileType.WAN_1: "pinyin13.png",  # 一萬
+    TileType.WAN_2: "pinyin14.png",  # 二萬
+    TileType.WAN_3: "pinyin15.png",  # 三萬
+    TileType.WAN_4: "pinyin7.png",   # 四萬
+    TileType.WAN_5: "pinyin8.png",   # 伍萬
+    TileType.WAN_6: "pinyin9.png",   # 六萬
+    TileType.WAN_7: "pinyin10.png",  # 七萬
+    TileType.WAN_8: "pinyin11.png",  # 八萬
+    TileType.WAN_9: "pinyin12.png",  # 九萬
+    TileType.EAST: "pinyin4.png",    # 東
+    TileType.SOUTH: "pinyin3.png",   # 南
+    TileType.WEST: "pinyin6.png",    # 西
+    TileType.NORTH: "pinyin5.png",   # 北
+    TileType.RED_DRAGON: "pinyin1.png",  # 中 (Chun) - червоний дракон
+    TileType.GREEN_DRAGON: "pinyin2.png",  # 發 (Hatsu) - зелений дракон
+    TileType.WHITE_DRAGON: "pinyin16.png",  # 白 (Haku) - білий/жовтий дракон (унікальний файл)
+    # Квіти та сезони
+    TileType.FLOWER_PLUM: "peony.png",
+    TileType.FLOWER_ORCHID: "orchid.png",
+    TileType.FLOWER_CHRYSANTHEMUM: "chrysanthemum.png",
+    TileType.FLOWER_BAMBOO: "lotus.png",
+    TileType.SEASON_SPRING: "spring.png",
+    TileType.SEASON_SUMMER: "summer.png",
+    TileType.SEASON_AUTUMN: "fall.png",
+    TileType.SEASON_WINTER: "winter.png",
+})
+# Оригінальні тейли (пошук у папці без урахування регістру)
+_TILE_FILENAMES_CLASSIC: Mapping[TileType, str] = MappingProxyType({
+    TileType.BAMBOO_1: "sou1.png",
+    TileType.BAMBOO_2: "sou2.png",
+    TileType.BAMBOO_3: "sou3.png",
+    TileType.BAMBOO_4: "sou4.png",
+    TileType.BAMBOO_5: "sou5.png",
+    TileType.BAMBOO_6: "sou6.png",
+    TileType.BAMBOO_7: "sou7.png",
+    TileType.BAMBOO_8: "sou8.png",
+    TileType.BAMBOO_9: "sou9.png",
+    TileType.DOT_1: "pin1.png",
+    TileType.DOT_2: "pin2.png",
+    TileType.DOT_3: "pin3.png",
+    TileType.DOT_4: "pin4.png",
+    TileType.DOT_5: "pin5.png",
+    TileType.DOT_6: "pin6.png",
+    TileType.DOT_7: "pin7.png",
+    TileType.DOT_8: "pin8.png",
+    TileType.DOT_9: "pin9.png",
+    TileType.WAN_1: "man1.png",
+    TileType.WAN_2: "man2.png",
+    TileType.WAN_3: "man3.png",
+    TileType.WAN_4: "man4.png",
+    TileType.WAN_5: "man5.png",
+    TileType.WAN_6: "man6.png",
+    TileType.WAN_7: "man7.png",
+    TileType.WAN_8: "man8.png",
+    TileType.WAN_9: "man9.png",
+    TileType.EAST: "ton.png",
+    TileType.SOUTH: "nan.png",
+    TileType.WEST: "shaa.png",
+    TileType.NORTH: "pei.png",
+    TileType.RED_DRAGON: "chun.png",
+    TileType.GREEN_DRAGON: "hatsu.png",
+    TileType.WHITE_DRAGON: "haku.png",
+})
+
+
+@lru_cache(maxsize=1)
+def _resolve_tile_images() -> Dict[TileType, str]:
+    """Знаходить файли зображень плиток (тип -> шлях). Результат кешується на весь процес:
+    у веб-режимі main() викликається для кожної сесії, а папка з тейлами не змінюється"""
     tile_images = {}
     # Спочатку пробуємо папку з 3D тейлами (fulltiles), якщо немає - використовуємо оригінальну
     tiles_dir_3d = Path("assets/fulltiles")
@@ -1378,123 +1535,51 @@ def main(page: ft.Page):
     if use_3d_tiles:
         tiles_dir = tiles_dir_3d
         print(f"✓ Використовую 3D тейли з {tiles_dir}")
-        # Маппінг для нових назв файлів у папці fulltiles
-        tile_file_mapping = {
-            TileType.BAMBOO_1: ["bamboo1.png"],
-            TileType.BAMBOO_2: ["bamboo2.png"],
-            TileType.BAMBOO_3: ["bamboo3.png"],
-            TileType.BAMBOO_4: ["bamboo4.png"],
-            TileType.BAMBOO_5: ["bamboo5.png"],
-            TileType.BAMBOO_6: ["bamboo6.png"],
-            TileType.BAMBOO_7: ["bamboo7.png"],
-            TileType.BAMBOO_8: ["bamboo8.png"],
-            TileType.BAMBOO_9: ["bamboo9.png"],
-            TileType.DOT_1: ["circle1.png"],
-            TileType.DOT_2: ["circle2.png"],
-            TileType.DOT_3: ["circle3.png"],
-            TileType.DOT_4: ["circle4.png"],
-            TileType.DOT_5: ["circle5.png"],
-            TileType.DOT_6: ["circle6.png"],
-            TileType.DOT_7: ["circle7.png"],
-            TileType.DOT_8: ["circle8.png"],
-            TileType.DOT_9: ["circle9.png"],
-            TileType.WAN_1: ["pinyin13.png"],  # 一萬
-            TileType.WAN_2: ["pinyin14.png"],  # 二萬
-            TileType.WAN_3: ["pinyin15.png"],  # 三萬
-            TileType.WAN_4: ["pinyin7.png"],   # 四萬
-            TileType.WAN_5: ["pinyin8.png"],   # 伍萬
-            TileType.WAN_6: ["pinyin9.png"],   # 六萬
-            TileType.WAN_7: ["pinyin10.png"],  # 七萬
-            TileType.WAN_8: ["pinyin11.png"],  # 八萬
-            TileType.WAN_9: ["pinyin12.png"],  # 九萬
-            TileType.EAST: ["pinyin4.png"],    # 東
-            TileType.SOUTH: ["pinyin3.png"],   # 南
-            TileType.WEST: ["pinyin6.png"],    # 西
-            TileType.NORTH: ["pinyin5.png"],   # 北
-            TileType.RED_DRAGON: ["pinyin1.png"],  # 中 (Chun) - червоний дракон
-            TileType.GREEN_DRAGON: ["pinyin2.png"],  # 發 (Hatsu) - зелений дракон
-            TileType.WHITE_DRAGON: ["pinyin16.png"],  # 白 (Haku) - білий/жовтий дракон (унікальний файл)
-            # Квіти та сезони
-            TileType.FLOWER_PLUM: ["peony.png"],
-            TileType.FLOWER_ORCHID: ["orchid.png"],
-            TileType.FLOWER_CHRYSANTHEMUM: ["chrysanthemum.png"],
-            TileType.FLOWER_BAMBOO: ["lotus.png"],
-            TileType.SEASON_SPRING: ["spring.png"],
-            TileType.SEASON_SUMMER: ["summer.png"],
-            TileType.SEASON_AUTUMN: ["fall.png"],
-            TileType.SEASON_WINTER: ["winter.png"],
-        }
+        tile_file_mapping = _TILE_FILENAMES_3D
     else:
         print(f"✓ Використовую оригінальні тейли з {tiles_dir}")
-        # Старий маппінг для оригінальних тейлів
-        tile_file_mapping = {
-            TileType.BAMBOO_1: ["Sou1.png", "sou1.png", "SOU1.png"],
-            TileType.BAMBOO_2: ["Sou2.png", "sou2.png", "SOU2.png"],
-            TileType.BAMBOO_3: ["Sou3.png", "sou3.png", "SOU3.png"],
-            TileType.BAMBOO_4: ["Sou4.png", "sou4.png", "SOU4.png"],
-            TileType.BAMBOO_5: ["Sou5.png", "sou5.png", "SOU5.png"],
-            TileType.BAMBOO_6: ["Sou6.png", "sou6.png", "SOU6.png"],
-            TileType.BAMBOO_7: ["Sou7.png", "sou7.png", "SOU7.png"],
-            TileType.BAMBOO_8: ["Sou8.png", "sou8.png", "SOU8.png"],
-            TileType.BAMBOO_9: ["Sou9.png", "sou9.png", "SOU9.png"],
-            TileType.DOT_1: ["Pin1.png", "pin1.png", "PIN1.png"],
-            TileType.DOT_2: ["Pin2.png", "pin2.png", "PIN2.png"],
-            TileType.DOT_3: ["Pin3.png", "pin3.png", "PIN3.png"],
-            TileType.DOT_4: ["Pin4.png", "pin4.png", "PIN4.png"],
-            TileType.DOT_5: ["Pin5.png", "pin5.png", "PIN5.png"],
-            TileType.DOT_6: ["Pin6.png", "pin6.png", "PIN6.png"],
-            TileType.DOT_7: ["Pin7.png", "pin7.png", "PIN7.png"],
-            TileType.DOT_8: ["Pin8.png", "pin8.png", "PIN8.png"],
-            TileType.DOT_9: ["Pin9.png", "pin9.png", "PIN9.png"],
-            TileType.WAN_1: ["Man1.png", "man1.png", "MAN1.png"],
-            TileType.WAN_2: ["Man2.png", "man2.png", "MAN2.png"],
-            TileType.WAN_3: ["Man3.png", "man3.png", "MAN3.png"],
-            TileType.WAN_4: ["Man4.png", "man4.png", "MAN4.png"],
-            TileType.WAN_5: ["Man5.png", "man5.png", "MAN5.png"],
-            TileType.WAN_6: ["Man6.png", "man6.png", "MAN6.png"],
-            TileType.WAN_7: ["Man7.png", "man7.png", "MAN7.png"],
-            TileType.WAN_8: ["Man8.png", "man8.png", "MAN8.png"],
-            TileType.WAN_9: ["Man9.png", "man9.png", "MAN9.png"],
-            TileType.EAST: ["Ton.png", "ton.png", "TON.png"],
-            TileType.SOUTH: ["Nan.png", "nan.png", "NAN.png"],
-            TileType.WEST: ["Shaa.png", "shaa.png", "SHAA.png"],
-            TileType.NORTH: ["Pei.png", "pei.png", "PEI.png"],
-            TileType.RED_DRAGON: ["Chun.png", "chun.png", "CHUN.png"],
-            TileType.GREEN_DRAGON: ["Hatsu.png", "hatsu.png", "HATSU.png"],
-            TileType.WHITE_DRAGON: ["Haku.png", "haku.png", "HAKU.png"],
-        }
+        tile_file_mapping = _TILE_FILENAMES_CLASSIC
     
     if tiles_dir.exists():
-        existing_files = {}
-        for file_path in tiles_dir.glob("*.png"):
-            existing_files[file_path.name.lower()] = file_path
+        # Один прохід по папці: ім'я файлу в нижньому регістрі -> шлях
+        existing_files = {file_path.name.lower(): file_path for file_path in tiles_dir.glob("*.png")}
         
         # Перевіряємо на конфлікти - один файл для кількох типів
         file_to_types = {}  # file -> list of tile_types
-        for tile_type, possible_names in tile_file_mapping.items():
-            for filename in possible_names:
-                file_key = filename.lower()
-                if file_key not in file_to_types:
-                    file_to_types[file_key] = []
-                file_to_types[file_key].append(tile_type)
+        for tile_type, filename in tile_file_mapping.items():
+            file_to_types.setdefault(filename, []).append(tile_type)
         
         # Виводимо попередження про конфлікти
         for file_key, types in file_to_types.items():
             if len(types) > 1:
                 print(f"WARNING: Файл {file_key} використовується для кількох типів тейлів: {[t.name for t in types]}")
         
-        for tile_type, possible_names in tile_file_mapping.items():
-            for filename in possible_names:
-                file_path = tiles_dir / filename
-                if file_path.exists() or filename.lower() in existing_files:
-                    if filename.lower() in existing_files:
-                        file_path = existing_files[filename.lower()]
-                    try:
-                        tile_images[tile_type] = str(file_path)
-                        print(f"DEBUG load_tiles: {tile_type.name} -> {file_path.name}")
-                        break
-                    except:
-                        pass
+        for tile_type, filename in tile_file_mapping.items():
+            file_path = existing_files.get(filename)
+            if file_path is not None:
+                tile_images[tile_type] = str(file_path)
+                logger.debug("load_tiles: %s -> %s", tile_type.name, file_path.name)
+    
+    return tile_images
+
+
+def main(page: ft.Page):
+    """Головна функція Flet додатку"""
+    page.title = "Mahjong Solitaire"
+    # Встановлюємо розмір вікна, щоб поміщалося на більшості моніторів
+    page.window.width = 1400
+    page.window.height = 790  # Збільшено висоту на 30 пікселів, щоб прибрати скрол
+    page.bgcolor = BACKGROUND_COLOR
+    page.scroll = ft.ScrollMode.HIDDEN  # Прибрано скрол - висота статична
+    page.padding = 0  # Прибрано padding, щоб не було пустого поля
+    
+    initialize_db()
+    # Гарантуємо наявність облікового запису адміністратора (admin/admin)
+    ensure_admin_profile()
+    board = Board()
+    
+    # Завантаження зображень плиток (папка сканується один раз на процес)
+    tile_images = _resolve_tile_images()
     
     # UI елементи
     board_container = ft.Stack([], width=1100, height=790)  # Збільшено висоту на 30 пікселів
@@ -1557,47 +1642,30 @@ def main(page: ft.Page):
     )
     # Простий напис на полі замість великого вікна
     finish_text_container: Optional[ft.Container] = None
-    leaderboard_table = ft.DataTable(
-        columns=[
-            ft.DataColumn(
-                label=ft.Container(
-                    content=ft.Text("Гравець", size=12, text_align=ft.TextAlign.CENTER),
-                    padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                    alignment=ft.alignment.center,
-                ),
-            ),
-            ft.DataColumn(
-                label=ft.Container(
-                    content=ft.Text("Найкращий час", size=12, text_align=ft.TextAlign.CENTER),
-                    padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                    alignment=ft.alignment.center,
-                ),
-            ),
-            ft.DataColumn(
-                label=ft.Container(
-                    content=ft.Text("Підказки", size=12, text_align=ft.TextAlign.CENTER),
-                    padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                    alignment=ft.alignment.center,
-                ),
-            ),
-            ft.DataColumn(
-                label=ft.Container(
-                    content=ft.Text("Тасування", size=12, text_align=ft.TextAlign.CENTER),
-                    padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                    alignment=ft.alignment.center,
-                ),
-            ),
-        ],
-        rows=[],
-        column_spacing=12,
-        heading_row_height=35,
-        data_row_min_height=35,
-        data_row_max_height=35,
-        divider_thickness=1,
-        border=ft.border.all(1, "#888888"),
-        width=500,
-        horizontal_lines=ft.border.BorderSide(1, "#888888"),
-        vertical_lines=ft.border.BorderSide(1, "#888888"),
+    # Таблиця лідерів - ListView з легких рядків (Row з Text фіксованої ширини)
+    # замість DataTable: менше вкладених контролів, а item_extent дозволяє
+    # Flet не будувати рядки поза видимою областю
+    LEADERBOARD_COLUMN_WIDTHS = (140, 120, 100, 100)
+    LEADERBOARD_ROW_HEIGHT = 35
+    leaderboard_header = ft.Container(
+        content=ft.Row(
+            [
+                ft.Text(title, size=12, width=width, text_align=ft.TextAlign.CENTER)
+                for title, width in zip(
+                    ("Гравець", "Найкращий час", "Підказки", "Тасування"),
+                    LEADERBOARD_COLUMN_WIDTHS,
+                )
+            ],
+            spacing=12,
+            alignment=ft.MainAxisAlignment.CENTER,
+        ),
+        height=LEADERBOARD_ROW_HEIGHT,
+        border=ft.border.only(bottom=ft.border.BorderSide(1, "#888888")),
+    )
+    leaderboard_table = ft.ListView(
+        controls=[],
+        item_extent=LEADERBOARD_ROW_HEIGHT,
+        expand=True,
     )
     
     leaderboard_overlay: Optional[ft.Container] = None
@@ -1612,9 +1680,9 @@ def main(page: ft.Page):
 
     def show_leaderboard(e):
         nonlocal leaderboard_overlay
-        print(f"DEBUG show_leaderboard: Викликано")
+        logger.debug("show_leaderboard: Викликано")
         refresh_leaderboard()
-        print(f"DEBUG show_leaderboard: refresh_leaderboard викликано, rows count={len(leaderboard_table.rows)}")
+        logger.debug("show_leaderboard: refresh_leaderboard викликано, rows count=%s", len(leaderboard_table.controls))
         
         # Створюємо overlay для лідерборду, якщо ще не створено
         if leaderboard_overlay is None:
@@ -1632,8 +1700,10 @@ def main(page: ft.Page):
                         [
                             ft.Text("Лідери", size=18, weight=ft.FontWeight.BOLD, color="#FFFFFF"),
                             ft.Container(
-                                content=leaderboard_table,
+                                content=ft.Column([leaderboard_header, leaderboard_table], spacing=0),
                                 height=350,
+                                width=500,
+                                border=ft.border.all(1, "#888888"),
                             ),
                             ft.Container(
                                 content=ft.ElevatedButton("Закрити", on_click=lambda e: close_leaderboard(), width=150),
@@ -1645,43 +1715,49 @@ def main(page: ft.Page):
                     ),
                 ),
             )
-            print(f"DEBUG show_leaderboard: leaderboard_overlay створено")
+            logger.debug("show_leaderboard: leaderboard_overlay створено")
         
         # Додаємо в page.overlay
         if leaderboard_overlay not in page.overlay:
             page.overlay.append(leaderboard_overlay)
-            print(f"DEBUG show_leaderboard: leaderboard_overlay додано в page.overlay")
+            logger.debug("show_leaderboard: leaderboard_overlay додано в page.overlay")
         leaderboard_overlay.visible = True
-        print(f"DEBUG show_leaderboard: overlay visible={leaderboard_overlay.visible}, overlay count={len(page.overlay)}")
+        logger.debug("show_leaderboard: overlay visible=%s, overlay count=%s", leaderboard_overlay.visible, len(page.overlay))
         page.update()
-        print(f"DEBUG show_leaderboard: page.update() викликано")
+        logger.debug("show_leaderboard: page.update() викликано")
     start_time = 0.0
     timer_running = False
     elapsed_seconds = 0
     timer_started = False
 
-    class RepeatingTimer:
+    class PageTimer:
+        """Періодичний таймер у циклі подій Flet (без окремого потоку)"""
+
         def __init__(self, period: float, callback):
             self.period = period
             self.callback = callback
-            self._stop_event = threading.Event()
-            self._thread: Optional[threading.Thread] = None
+            self._active = False
+            # Кожен start() отримує нове покоління - старий цикл після
+            # stop()/start() завершується сам, не дублюючи тіки
+            self._generation = 0
 
         def start(self):
-            if self._thread and self._thread.is_alive():
+            if self._active:
                 return
-            self._stop_event.clear()
-            self._thread = threading.Thread(target=self._run, daemon=True)
-            self._thread.start()
+            self._active = True
+            self._generation += 1
+            generation = self._generation
+
+            async def _timer_loop():
+                while self._active and self._generation == generation:
+                    await asyncio.sleep(self.period)
+                    if self._active and self._generation == generation:
+                        self.callback(None)
 
-        def _run(self):
-            while not self._stop_event.wait(self.period):
-                self.callback(None)
+            page.run_task(_timer_loop)
 
         def stop(self):
-            self._stop_event.set()
-            if self._thread:
-                self._thread.join(timeout=0.1)
+            self._active = False
 
     
     def play_pause_sound(sound_name: str):
@@ -1697,10 +1773,18 @@ def main(page: ft.Page):
         if not timer_running:
             return
         elapsed_seconds = int(time.time() - start_time)
-        timer_text.value = format_duration(elapsed_seconds)
-        page.update()
+        value = format_duration(elapsed_seconds)
+        if value == timer_text.value:
+            return
+        timer_text.value = value
+        # Змінюється лише текст таймера - надсилаємо тільки його, а не все дерево сторінки
+        try:
+            timer_text.update()
+        except (AssertionError, RuntimeError):
+            # Таймер зараз не на сторінці (інший екран) - значення підхопиться при наступному показі
+            pass
 
-    timer_control = RepeatingTimer(1, on_timer_tick)
+    timer_control = PageTimer(1, on_timer_tick)
     
     # Новий простий функціонал входу/реєстрації
     login_username_field = ft.TextField(label="Логін", width=250, autofocus=True)
@@ -1736,7 +1820,7 @@ def main(page: ft.Page):
         profile_label.value = f"Гравець: {profile['username']}"
         game_records = fetch_profile_records(profile["id"])
         refresh_records_table()
-        refresh_profile_stats()
+        mark_profile_stats_dirty()
         
         # Не завантажуємо hints та shuffles при вході - вони завантажуються при старті гри
         # hints та shuffles в базі - це додаткові куплені, які додаються до базових (2/1) при старті гри
@@ -1774,8 +1858,9 @@ def main(page: ft.Page):
         if duel2_button:
             duel2_button.visible = True
         
-        refresh_leaderboard()
-        refresh_profile_stats()
+        mark_leaderboard_dirty()
+        mark_profile_stats_dirty()
+        flush_dirty_refreshes()
         update_board()
         page.update()
     
@@ -1945,7 +2030,7 @@ def main(page: ft.Page):
     def show_auth_dialog():
         """Показати overlay входу/реєстрації"""
         nonlocal auth_overlay_container
-        print("DEBUG: show_auth_dialog викликано")
+        logger.debug("show_auth_dialog викликано")
         
         # Створюємо overlay контейнер
         auth_overlay_container = ft.Container(
@@ -2011,9 +2096,9 @@ def main(page: ft.Page):
         # Додаємо в page.overlay
         if auth_overlay_container not in page.overlay:
             page.overlay.append(auth_overlay_container)
-        print(f"DEBUG: auth_overlay_container додано в page.overlay, overlay count={len(page.overlay)}")
+        logger.debug("auth_overlay_container додано в page.overlay, overlay count=%s", len(page.overlay))
         page.update()
-        print("DEBUG: page.update() викликано після показу overlay")
+        logger.debug("page.update() викликано після показу overlay")
 
     def refresh_profile_stats():
         if not current_profile["id"]:
@@ -2094,137 +2179,106 @@ def main(page: ft.Page):
         pause_button.text = "Продовжити" if is_paused else "Пауза"
         pause_button.disabled = not game_started or board.game_over
 
-    def format_timestamp(iso_timestamp: str) -> str:
-        """Форматує ISO timestamp в короткий формат"""
-        try:
-            # Парсимо ISO формат
-            dt = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
-            # Форматуємо як "22.11.2025 13:56" з меншим розміром
-            return dt.strftime("%d.%m.%Y %H:%M")
-        except:
-            # Якщо не вдалося розпарсити - повертаємо як є, але обрізаємо
-            return iso_timestamp[:16] if len(iso_timestamp) > 16 else iso_timestamp
-    
-    def refresh_records_table():
-        records_table.rows = [
-            ft.DataRow(
-                cells=[
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                format_timestamp(record["timestamp"]), 
-                                text_align=ft.TextAlign.LEFT,
-                                no_wrap=True,
-                            ),
-                            padding=ft.padding.only(left=2, right=4, top=4, bottom=4),
-                            alignment=ft.alignment.center_left,
-                        )
-                    ),
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                record["time"], 
-                                text_align=ft.TextAlign.CENTER,
-                                no_wrap=True,
-                            ),
-                            padding=ft.padding.symmetric(horizontal=6, vertical=4),
-                            alignment=ft.alignment.center,
-                        )
-                    ),
-                ],
-            )
-            for record in game_records
+    def _make_records_row() -> Tuple[ft.DataRow, List[ft.Text]]:
+        """Створює рядок таблиці записів; повертає рядок і його текстові поля"""
+        date_text = ft.Text("", text_align=ft.TextAlign.LEFT, no_wrap=True)
+        time_text = ft.Text("", text_align=ft.TextAlign.CENTER, no_wrap=True)
+        row = ft.DataRow(
+            cells=[
+                ft.DataCell(
+                    ft.Container(
+                        content=date_text,
+                        padding=ft.padding.only(left=2, right=4, top=4, bottom=4),
+                        alignment=ft.alignment.center_left,
+                    )
+                ),
+                ft.DataCell(
+                    ft.Container(
+                        content=time_text,
+                        padding=ft.padding.symmetric(horizontal=6, vertical=4),
+                        alignment=ft.alignment.center,
+                    )
+                ),
+            ],
+        )
+        return row, [date_text, time_text]
+
+    def _make_leaderboard_row() -> Tuple[ft.Container, List[ft.Text]]:
+        """Створює рядок таблиці лідерів; повертає рядок і його текстові поля"""
+        texts = [
+            ft.Text("", width=width, text_align=ft.TextAlign.CENTER, no_wrap=True)
+            for width in LEADERBOARD_COLUMN_WIDTHS
         ]
+        row = ft.Container(
+            content=ft.Row(texts, spacing=12, alignment=ft.MainAxisAlignment.CENTER),
+            height=LEADERBOARD_ROW_HEIGHT,
+            border=ft.border.only(bottom=ft.border.BorderSide(1, "#888888")),
+        )
+        return row, texts
+
+    # Пули рядків створюються один раз - при оновленні змінюємо лише значення тексту,
+    # а не будуємо контроли рядків заново
+    # (записів не більше 5, лідерів - ліміт fetch_leaderboard за замовчуванням)
+    _records_row_pool: List[Tuple[ft.DataRow, List[ft.Text]]] = [_make_records_row() for _ in range(5)]
+    _leaderboard_row_pool: List[Tuple[ft.Container, List[ft.Text]]] = [_make_leaderboard_row() for _ in range(10)]
+
+    def refresh_records_table():
+        while len(_records_row_pool) < len(game_records):
+            _records_row_pool.append(_make_records_row())
+        for (_, (date_text, time_text)), record in zip(_records_row_pool, game_records):
+            date_text.value = format_timestamp(record["timestamp"])
+            time_text.value = record["time"]
+        records_table.rows = [row for row, _ in _records_row_pool[:len(game_records)]]
 
     def refresh_leaderboard():
-        print(f"DEBUG refresh_leaderboard: Початок оновлення таблиці лідерів")
+        logger.debug("refresh_leaderboard: Початок оновлення таблиці лідерів")
         leaderboard = fetch_leaderboard()
-        print(f"DEBUG refresh_leaderboard: Отримано {len(leaderboard)} записів")
-        for i, entry in enumerate(leaderboard):
-            print(f"DEBUG refresh_leaderboard: entry[{i}] = {entry}")
-        print(f"DEBUG refresh_leaderboard: Створюю рядки для таблиці...")
-        leaderboard_table.rows = [
-            ft.DataRow(
-                cells=[
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(entry["username"], text_align=ft.TextAlign.CENTER),
-                            padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                            alignment=ft.alignment.center,
-                        )
-                    ),
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                format_duration(entry["best_time"]) if entry["best_time"] else "--:--",
-                                text_align=ft.TextAlign.CENTER
-                            ),
-                            padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                            alignment=ft.alignment.center,
-                        )
-                    ),
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                str(entry.get("hints_used", 0)) if entry.get("best_time") else "--",
-                                text_align=ft.TextAlign.CENTER
-                            ),
-                            padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                            alignment=ft.alignment.center,
-                        )
-                    ),
-                    ft.DataCell(
-                        ft.Container(
-                            content=ft.Text(
-                                str(entry.get("shuffle_used", 0)) if entry.get("best_time") else "--",
-                                text_align=ft.TextAlign.CENTER
-                            ),
-                            padding=ft.padding.symmetric(horizontal=8, vertical=4),
-                            alignment=ft.alignment.center,
-                        )
-                    ),
-                ]
-            )
-            for entry in leaderboard
-        ]
-        # Додаємо порожній рядок для горизонтальної лінії після останнього користувача
-        if leaderboard_table.rows:
-            leaderboard_table.rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(
-                            ft.Container(
-                                content=ft.Text("", size=1),
-                                height=1,
-                                padding=0,
-                            )
-                        ),
-                        ft.DataCell(
-                            ft.Container(
-                                content=ft.Text("", size=1),
-                                height=1,
-                                padding=0,
-                            )
-                        ),
-                        ft.DataCell(
-                            ft.Container(
-                                content=ft.Text("", size=1),
-                                height=1,
-                                padding=0,
-                            )
-                        ),
-                        ft.DataCell(
-                            ft.Container(
-                                content=ft.Text("", size=1),
-                                height=1,
-                                padding=0,
-                            )
-                        ),
-                    ]
-                )
-            )
-        print(f"DEBUG refresh_leaderboard: Додано {len(leaderboard_table.rows)} рядків у таблицю")
-        print(f"DEBUG refresh_leaderboard: Таблиця оновлена, потрібно викликати page.update() для відображення змін")
+        logger.debug("refresh_leaderboard: Отримано %s записів", len(leaderboard))
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, entry in enumerate(leaderboard):
+                logger.debug("refresh_leaderboard: entry[%s] = %s", i, entry)
+        logger.debug("refresh_leaderboard: Створюю рядки для таблиці...")
+        while len(_leaderboard_row_pool) < len(leaderboard):
+            _leaderboard_row_pool.append(_make_leaderboard_row())
+        for (_, texts), entry in zip(_leaderboard_row_pool, leaderboard):
+            has_time = bool(entry.get("best_time"))
+            texts[0].value = entry["username"]
+            texts[1].value = format_duration(entry["best_time"]) if has_time else "--:--"
+            texts[2].value = str(entry.get("hints_used", 0)) if has_time else "--"
+            texts[3].value = str(entry.get("shuffle_used", 0)) if has_time else "--"
+        leaderboard_table.controls = [row for row, _ in _leaderboard_row_pool[:len(leaderboard)]]
+        logger.debug("refresh_leaderboard: Додано %s рядків у таблицю", len(leaderboard_table.controls))
+        logger.debug("refresh_leaderboard: Таблиця оновлена, потрібно викликати page.update() для відображення змін")
+
+    # Відкладене оновлення лідерів/статистики: обробник лише позначає дані "брудними",
+    # а наприкінці (перед своїм page.update()) один раз викликає flush_dirty_refreshes() -
+    # кілька позначок зводяться до одного запиту в БД. Обробники Flet працюють у різних
+    # потоках, тому прапорці змінюються під блокуванням
+    leaderboard_dirty = False
+    profile_stats_dirty = False
+    dirty_lock = threading.Lock()
+
+    def mark_leaderboard_dirty():
+        nonlocal leaderboard_dirty
+        with dirty_lock:
+            leaderboard_dirty = True
+
+    def mark_profile_stats_dirty():
+        nonlocal profile_stats_dirty
+        with dirty_lock:
+            profile_stats_dirty = True
+
+    def flush_dirty_refreshes():
+        """Виконує позначені оновлення; page.update() викликає сам обробник"""
+        nonlocal leaderboard_dirty, profile_stats_dirty
+        with dirty_lock:
+            refresh_lb, leaderboard_dirty = leaderboard_dirty, False
+            refresh_stats, profile_stats_dirty = profile_stats_dirty, False
+        if refresh_lb:
+            refresh_leaderboard()
+        if refresh_stats:
+            refresh_profile_stats()
+
     def add_record(result_label: str, timestamp: Optional[str] = None):
         nonlocal game_records
         duration = elapsed_seconds if elapsed_seconds else int(time.time() - start_time)
@@ -2238,7 +2292,7 @@ def main(page: ft.Page):
                 current_pattern_name,
             )
             game_records = fetch_profile_records(current_profile["id"])
-            refresh_profile_stats()
+            mark_profile_stats_dirty()
         else:
             if timestamp is None:
                 timestamp = datetime.now().isoformat()
@@ -2296,11 +2350,12 @@ def main(page: ft.Page):
             duel_button.visible = False
         if duel2_button:
             duel2_button.visible = False
-        update_action_ui()
-        update_board()
         if show_notification:
             page.snack_bar = ft.SnackBar(ft.Text("Нова гра розпочата"), open=True)
-        refresh_leaderboard()
+        mark_leaderboard_dirty()
+        flush_dirty_refreshes()
+        # update_board сам викликає update_action_ui() і page.update() (разом зі snack_bar)
+        update_board()
 
     def finalize_game(result_label: str):
         nonlocal current_session_id, duel2_button
@@ -2326,15 +2381,15 @@ def main(page: ft.Page):
         session_id_to_end = current_session_id
         if session_id_to_end:
             session_end_time = end_session(session_id_to_end, result_label, hints_used, shuffle_used)
-            print(f"DEBUG finalize_game: Завершено сесію {session_id_to_end}, end_time={session_end_time}, hints={hints_used}, shuffle={shuffle_used}")
+            logger.debug("finalize_game: Завершено сесію %s, end_time=%s, hints=%s, shuffle=%s", session_id_to_end, session_end_time, hints_used, shuffle_used)
             current_session_id = None
         else:
-            print(f"DEBUG finalize_game: ПОМИЛКА! current_session_id is None, дані про підказки та тасування не будуть збережені!")
+            logger.debug("finalize_game: ПОМИЛКА! current_session_id is None, дані про підказки та тасування не будуть збережені!")
         
         # Потім додаємо запис, використовуючи той самий timestamp
         add_record(result_label, session_end_time)
-        print(f"DEBUG finalize_game: Додано запис з timestamp={session_end_time}")
-        refresh_leaderboard()
+        logger.debug("finalize_game: Додано запис з timestamp=%s", session_end_time)
+        mark_leaderboard_dirty()
         
         # Нараховуємо coins за результати гри (тільки для пасьянс-1 і пасьянс-2, не дуелі)
         coins_to_add = 0
@@ -2358,7 +2413,7 @@ def main(page: ft.Page):
             if coins_to_add > 0:
                 current_coins = get_user_coins(current_profile["id"])
                 update_user_coins(current_profile["id"], current_coins + coins_to_add)
-                print(f"DEBUG finalize_game: Нараховано {coins_to_add} coins. Загалом: {current_coins + coins_to_add}")
+                logger.debug("finalize_game: Нараховано %s coins. Загалом: %s", coins_to_add, current_coins + coins_to_add)
                 # Оновлюємо відображення coins в sidebar
                 update_sidebar()
         
@@ -2436,9 +2491,9 @@ def main(page: ft.Page):
             alignment=ft.alignment.center,
         )
         page.snack_bar = ft.SnackBar(ft.Text(f"Гра завершена: {result_label}"), open=True)
-        update_action_ui()
+        flush_dirty_refreshes()
+        # update_board сам викликає update_action_ui() і page.update()
         update_board()
-        page.update()
 
     def request_hint(e):
         nonlocal hints_remaining
@@ -2543,8 +2598,9 @@ def main(page: ft.Page):
             play_pause_sound("SystemExclamation")
             pause_overlay.visible = False
         update_action_ui()
-        update_board()
-        page.update()
+        # Дошка під час паузи не змінюється - не перебудовуємо її, а надсилаємо
+        # лише змінені контроли (pause_overlay всередині board_container)
+        page.update(board_container, hint_button, shuffle_button, pause_button)
 
     reshuffle_dialog = ft.AlertDialog(
         title=ft.Text("Немає ходів"),
@@ -2726,12 +2782,12 @@ def main(page: ft.Page):
     # АДМІНСЬКА КНОПКА ДЛЯ ТЕСТУВАННЯ - видаляє 10 плиток
     def admin_remove_10_tiles(e):
         """Адмінська функція для швидкого тестування - видаляє 10 доступних плиток"""
-        print("DEBUG admin_remove_10_tiles: Кнопка натиснута")
+        logger.debug("admin_remove_10_tiles: Кнопка натиснута")
         if board.game_over:
-            print("DEBUG admin_remove_10_tiles: Гра вже завершена")
+            logger.debug("admin_remove_10_tiles: Гра вже завершена")
             return
         if start_button and start_button.visible:
-            print("DEBUG admin_remove_10_tiles: Гра не почалася")
+            logger.debug("admin_remove_10_tiles: Гра не почалася")
             page.snack_bar = ft.SnackBar(ft.Text("Спочатку почни гру"), open=True)
             page.update()
             return
@@ -2742,10 +2798,10 @@ def main(page: ft.Page):
             if not tile.removed and board.is_tile_available(tile):
                 available_tiles.append(tile)
         
-        print(f"DEBUG admin_remove_10_tiles: Знайдено {len(available_tiles)} доступних плиток")
+        logger.debug("admin_remove_10_tiles: Знайдено %s доступних плиток", len(available_tiles))
         
         if not available_tiles:
-            print("DEBUG admin_remove_10_tiles: Немає доступних плиток")
+            logger.debug("admin_remove_10_tiles: Немає доступних плиток")
             page.snack_bar = ft.SnackBar(ft.Text("Немає доступних плиток"), open=True)
             page.update()
             return
@@ -2757,13 +2813,13 @@ def main(page: ft.Page):
                 tile.removed = True
                 removed_count += 1
         
-        print(f"DEBUG admin_remove_10_tiles: Видалено {removed_count} плиток")
+        logger.debug("admin_remove_10_tiles: Видалено %s плиток", removed_count)
         
         update_board()
         check_game_state()
         page.snack_bar = ft.SnackBar(ft.Text(f"Видалено {removed_count} плиток (адмін)"), open=True)
         page.update()
-        print("DEBUG admin_remove_10_tiles: Оновлення завершено")
+        logger.debug("admin_remove_10_tiles: Оновлення завершено")
     
     admin_button = ft.ElevatedButton(
         "-10",
@@ -2850,12 +2906,12 @@ def main(page: ft.Page):
     def confirm_end_game_and_show_modes(e):
         """Підтверджує завершення гри і показує режими"""
         nonlocal current_session_id, board, hints_remaining, shuffle_remaining
-        print(f"DEBUG confirm_end_game_and_show_modes: Викликано")
+        logger.debug("confirm_end_game_and_show_modes: Викликано")
         close_end_game_dialog()
         
         # Завершуємо гру як "Перервано"
         if board and not board.game_over and current_session_id is not None:
-            print(f"DEBUG confirm_end_game_and_show_modes: Завершую гру")
+            logger.debug("confirm_end_game_and_show_modes: Завершую гру")
             # Обчислюємо підказки і тасування
             HINT_LIMIT = 2
             SHUFFLE_LIMIT = 1
@@ -2882,7 +2938,7 @@ def main(page: ft.Page):
     def show_modes_page_internal():
         """Внутрішня функція для показу сторінки вибору режимів"""
         nonlocal start_button, solitaire2_button, duel_button, duel2_button, board, current_session_id, pattern_constructor_mode, finish_text_container
-        print(f"DEBUG show_modes_page_internal: Викликано")
+        logger.debug("show_modes_page_internal: Викликано")
         pattern_constructor_mode = False  # Скидаємо режим конструктора при показі режимів
         # Приховуємо напис фінішу при виборі режимів
         if finish_text_container:
@@ -2890,26 +2946,26 @@ def main(page: ft.Page):
         
         # Ініціалізуємо кнопки, якщо вони ще не ініціалізовані
         if start_button is None:
-            print(f"DEBUG show_modes_page_internal: Ініціалізую start_button")
+            logger.debug("show_modes_page_internal: Ініціалізую start_button")
             initialize_start_button()
         if solitaire2_button is None:
-            print(f"DEBUG show_modes_page_internal: Ініціалізую solitaire2_button")
+            logger.debug("show_modes_page_internal: Ініціалізую solitaire2_button")
             initialize_solitaire2_button()
         if duel_button is None:
-            print(f"DEBUG show_modes_page_internal: Ініціалізую duel_button")
+            logger.debug("show_modes_page_internal: Ініціалізую duel_button")
             initialize_duel_button()
         if duel2_button is None:
-            print(f"DEBUG show_modes_page_internal: Ініціалізую duel2_button")
+            logger.debug("show_modes_page_internal: Ініціалізую duel2_button")
             initialize_duel2_button()
         
         # Якщо гра завершена, закриваємо сесію
         if board and board.game_over and current_session_id is not None:
-            print(f"DEBUG show_modes_page_internal: Гра завершена, закриваю сесію")
+            logger.debug("show_modes_page_internal: Гра завершена, закриваю сесію")
             current_session_id = None
         
         # Перевіряємо, чи користувач увійшов
         if current_profile["id"] is None:
-            print(f"DEBUG show_modes_page_internal: Користувач не увійшов")
+            logger.debug("show_modes_page_internal: Користувач не увійшов")
             page.snack_bar = ft.SnackBar(ft.Text("Спочатку увійди в систему"), open=True)
             page.update()
             return
@@ -2917,7 +2973,7 @@ def main(page: ft.Page):
         # Показуємо кнопки режимів
         if start_button:
             start_button.visible = True
-            print(f"DEBUG show_modes_page_internal: start_button.visible встановлено в True")
+            logger.debug("show_modes_page_internal: start_button.visible встановлено в True")
         # Оновлюємо список патернів для solitaire1 перед показом
         if solitaire1_pattern_dropdown:
             refresh_solitaire1_dropdown()
@@ -2926,20 +2982,20 @@ def main(page: ft.Page):
             refresh_solitaire2_dropdown()
         if solitaire2_button:
             solitaire2_button.visible = True
-            print(f"DEBUG show_modes_page_internal: solitaire2_button.visible встановлено в True")
+            logger.debug("show_modes_page_internal: solitaire2_button.visible встановлено в True")
         if solitaire2_pattern_dropdown:
             solitaire2_pattern_dropdown.visible = True
         if duel_button:
             duel_button.visible = True
-            print(f"DEBUG show_modes_page_internal: duel_button.visible встановлено в True")
+            logger.debug("show_modes_page_internal: duel_button.visible встановлено в True")
         if duel2_button:
             duel2_button.visible = True
-            print(f"DEBUG show_modes_page_internal: duel2_button.visible встановлено в True")
+            logger.debug("show_modes_page_internal: duel2_button.visible встановлено в True")
         
         # Оновлюємо дошку, щоб показати рамочки з кнопками
         update_board()
         page.update()
-        print(f"DEBUG show_modes_page_internal: update_board() та page.update() викликано")
+        logger.debug("show_modes_page_internal: update_board() та page.update() викликано")
     
     # Конструктор патернів
     pattern_constructor_mode = False
@@ -2965,13 +3021,13 @@ def main(page: ft.Page):
             sidebar_slots_area.content = ft.Stack([])
         else:
             sidebar_slots_area.content.controls.clear()
-        print(f"DEBUG initialize_pattern_constructor: Створено порожній патерн 1x{constructor_rows}x{constructor_cols}")
+        logger.debug("initialize_pattern_constructor: Створено порожній патерн 1x%sx%s", constructor_rows, constructor_cols)
     
     def open_pattern_constructor():
         """Відкриває конструктор патернів"""
         nonlocal pattern_constructor_mode, board, start_button, solitaire2_button, duel_button, duel2_button, finish_text_container
         global game_mode
-        print(f"DEBUG open_pattern_constructor: Відкриваю конструктор")
+        logger.debug("open_pattern_constructor: Відкриваю конструктор")
         
         # Перевіряємо, чи гра активна
         is_game_active = board and not board.game_over and current_session_id is not None
@@ -3006,10 +3062,10 @@ def main(page: ft.Page):
         pattern_constructor_mode = True
         game_mode = "pattern_constructor"
         initialize_pattern_constructor()
-        print(f"DEBUG open_pattern_constructor: pattern_constructor_mode={pattern_constructor_mode}, game_mode={game_mode}")
+        logger.debug("open_pattern_constructor: pattern_constructor_mode=%s, game_mode=%s", pattern_constructor_mode, game_mode)
         update_board()
         page.update()
-        print(f"DEBUG open_pattern_constructor: update_board() та page.update() викликано")
+        logger.debug("open_pattern_constructor: update_board() та page.update() викликано")
     
     def close_pattern_constructor():
         """Закриває конструктор патернів"""
@@ -3031,7 +3087,7 @@ def main(page: ft.Page):
         def on_game_mode_changed(e):
             nonlocal constructor_game_mode
             constructor_game_mode = e.control.value
-            print(f"DEBUG render_pattern_constructor: Змінено тип пасьянсу на {constructor_game_mode}")
+            logger.debug("render_pattern_constructor: Змінено тип пасьянсу на %s", constructor_game_mode)
         
         game_mode_dropdown = ft.Dropdown(
             label="Тип пасьянсу",
@@ -3263,7 +3319,7 @@ def main(page: ft.Page):
             constructor_pattern.append(new_layer)
             # Перемикаємося на новий шар
             constructor_current_layer = len(constructor_pattern) - 1
-            print(f"DEBUG add_layer: Додано новий шар. Всього шарів: {len(constructor_pattern)}, поточний: {constructor_current_layer}")
+            logger.debug("add_layer: Додано новий шар. Всього шарів: %s, поточний: %s", len(constructor_pattern), constructor_current_layer)
             update_board()
             page.update()
         
@@ -3355,7 +3411,7 @@ def main(page: ft.Page):
             hint_text="Введіть назву",
             value=initial_pattern_name,  # Встановлюємо значення при створенні
         )
-        print(f"DEBUG render_constructor_controls: Створено pattern_name_field з value='{initial_pattern_name}' (constructor_loaded_pattern_name='{constructor_loaded_pattern_name}')")
+        logger.debug("render_constructor_controls: Створено pattern_name_field з value='%s' (constructor_loaded_pattern_name='%s')", initial_pattern_name, constructor_loaded_pattern_name)
         board_container.controls.append(
             ft.Container(
                 content=pattern_name_field,
@@ -3439,7 +3495,7 @@ def main(page: ft.Page):
                     # Якщо назва змінилася, видаляємо старий файл
                     if pattern_name != constructor_loaded_pattern_name:
                         old_pattern_file.unlink()
-                        print(f"DEBUG save_pattern: Видалено старий файл '{old_pattern_file}' після зміни назви")
+                        logger.debug("save_pattern: Видалено старий файл '%s' після зміни назви", old_pattern_file)
                 else:
                     pattern_data["created_at"] = datetime.now().isoformat()
                 
@@ -3467,7 +3523,7 @@ def main(page: ft.Page):
                 json.dump(pattern_data, f, indent=2, ensure_ascii=False)
             
             page.snack_bar = ft.SnackBar(ft.Text(message), open=True)
-            print(f"DEBUG save_pattern: {'Оновлено' if (is_editing or pattern_exists) else 'Збережено'} патерн '{pattern_name}' з {total_marked} позначеними місцями")
+            logger.debug("save_pattern: %s патерн '%s' з %s позначеними місцями", 'Оновлено' if is_editing or pattern_exists else 'Збережено', pattern_name, total_marked)
             # Оновлюємо випадаюче меню, щоб показати новий патерн
             refresh_pattern_dropdown()
             # Оновлюємо меню для solitaire1 та solitaire2
@@ -3601,7 +3657,7 @@ def main(page: ft.Page):
                     elif loaded_game_mode in ("Пасьянс 2", "solitaire2"):
                         loaded_game_mode = "solitaire2"
                     constructor_game_mode = loaded_game_mode
-                    print(f"DEBUG load_pattern_for_edit: Завантажено патерн '{loaded_pattern_name}' (selected_name='{selected_name}'), game_mode={loaded_game_mode}")
+                    logger.debug("load_pattern_for_edit: Завантажено патерн '%s' (selected_name='%s'), game_mode=%s", loaded_pattern_name, selected_name, loaded_game_mode)
                     
                     page.snack_bar = ft.SnackBar(ft.Text(f"Патерн '{loaded_pattern_name}' завантажено для редагування"), open=True)
                     # Оновлюємо дошку (це очистить controls і перестворює pattern_name_field з правильним значенням)
@@ -3660,7 +3716,7 @@ def main(page: ft.Page):
             
             try:
                 pattern_file.unlink()
-                print(f"DEBUG delete_pattern: Файл '{pattern_file}' видалено")
+                logger.debug("delete_pattern: Файл '%s' видалено", pattern_file)
                 page.snack_bar = ft.SnackBar(ft.Text(f"Патерн '{selected_name}' видалено"), open=True)
                 # Очищаємо поле конструктора
                 nonlocal constructor_pattern
@@ -3677,7 +3733,7 @@ def main(page: ft.Page):
                 pattern_dropdown.value = None
                 update_board()
                 page.update()
-                print(f"DEBUG delete_pattern: Патерн '{selected_name}' видалено, поле очищено, меню оновлено")
+                logger.debug("delete_pattern: Патерн '%s' видалено, поле очищено, меню оновлено", selected_name)
             except Exception as ex:
                 page.snack_bar = ft.SnackBar(ft.Text(f"Помилка видалення: {ex}"), open=True)
                 page.update()
@@ -3749,7 +3805,7 @@ def main(page: ft.Page):
         
         # Перемикаємо позначку: True -> False, False -> True
         constructor_pattern[current_z][y][x] = not constructor_pattern[current_z][y][x]
-        print(f"DEBUG constructor_cell_clicked: {'Позначено' if constructor_pattern[current_z][y][x] else 'Знято позначку'} місце для тейла на ({x},{y},{current_z})")
+        logger.debug("constructor_cell_clicked: %s місце для тейла на (%s,%s,%s)", 'Позначено' if constructor_pattern[current_z][y][x] else 'Знято позначку', x, y, current_z)
         
         update_board()
         page.update()
@@ -3764,7 +3820,7 @@ def main(page: ft.Page):
         """Зберігає патерн під назвою"""
         nonlocal constructor_pattern
         # TODO: Додати діалог введення назви та збереження
-        print(f"DEBUG save_pattern: Зберігаю патерн (TODO: діалог введення назви)")
+        logger.debug("save_pattern: Зберігаю патерн (TODO: діалог введення назви)")
         page.snack_bar = ft.SnackBar(ft.Text("Функція збереження в розробці"), open=True)
         page.update()
     
@@ -3774,22 +3830,22 @@ def main(page: ft.Page):
         # Приховуємо напис фінішу при виборі режимів
         if finish_text_container:
             finish_text_container.visible = False
-        print(f"DEBUG show_modes_page: Викликано")
-        print(f"DEBUG show_modes_page: current_profile['id']={current_profile['id']}")
-        print(f"DEBUG show_modes_page: board={board}")
-        print(f"DEBUG show_modes_page: board.game_over={board.game_over if board else 'None'}")
-        print(f"DEBUG show_modes_page: current_session_id={current_session_id}")
+        logger.debug("show_modes_page: Викликано")
+        logger.debug("show_modes_page: current_profile['id']=%s", current_profile['id'])
+        logger.debug("show_modes_page: board=%s", board)
+        logger.debug("show_modes_page: board.game_over=%s", board.game_over if board else 'None')
+        logger.debug("show_modes_page: current_session_id=%s", current_session_id)
         
         # Перевіряємо, чи гра активна (не завершена і є активна сесія)
         is_game_active = board and not board.game_over and current_session_id is not None
-        print(f"DEBUG show_modes_page: is_game_active={is_game_active}")
+        logger.debug("show_modes_page: is_game_active=%s", is_game_active)
         
         if is_game_active:
-            print(f"DEBUG show_modes_page: Гра активна, показую діалог підтвердження")
+            logger.debug("show_modes_page: Гра активна, показую діалог підтвердження")
             nonlocal end_game_overlay
             # Створюємо overlay, якщо він ще не створений
             if end_game_overlay is None:
-                print(f"DEBUG show_modes_page: Створюю end_game_overlay")
+                logger.debug("show_modes_page: Створюю end_game_overlay")
                 end_game_overlay = ft.Container(
                     expand=True,
                     bgcolor="#000000DD",
@@ -3825,13 +3881,13 @@ def main(page: ft.Page):
             if end_game_overlay not in page.overlay:
                 page.overlay.append(end_game_overlay)
             end_game_overlay.visible = True
-            print(f"DEBUG show_modes_page: end_game_overlay.visible встановлено в True, викликаю page.update()")
+            logger.debug("show_modes_page: end_game_overlay.visible встановлено в True, викликаю page.update()")
             page.update()
-            print(f"DEBUG show_modes_page: page.update() викликано")
+            logger.debug("show_modes_page: page.update() викликано")
             return
         
         # Якщо гра не активна, просто показуємо режими
-        print(f"DEBUG show_modes_page: Гра не активна, показую режими безпосередньо")
+        logger.debug("show_modes_page: Гра не активна, показую режими безпосередньо")
         show_modes_page_internal()
     
     modes_button = ft.ElevatedButton(
@@ -3860,7 +3916,7 @@ def main(page: ft.Page):
         game_records = []
         
         # Оновлюємо статистику
-        refresh_profile_stats()
+        mark_profile_stats_dirty()
         refresh_records_table()
         
         # Оновлюємо sidebar
@@ -3870,6 +3926,7 @@ def main(page: ft.Page):
         show_auth_dialog()
         
         # Оновлюємо дошку
+        flush_dirty_refreshes()
         update_board()
         page.update()
     
@@ -4131,7 +4188,7 @@ def main(page: ft.Page):
         ],
         expand=False,  # Прибрано expand, щоб не було пустого поля
     )
-    print(f"DEBUG: main_stack створено, controls count={len(main_stack.controls)}")
+    logger.debug("main_stack створено, controls count=%s", len(main_stack.controls))
     update_action_ui()
     def is_tile_darkened_solitaire2(tile: Tile) -> bool:
         """Перевіряє, чи тейл має бути затемнений для Пасьянс-2"""
@@ -4289,9 +4346,9 @@ def main(page: ft.Page):
             
             # Перевіряємо, чи тейл доступний для видалення
             is_available = board.is_tile_available(tile)
-            print(f"DEBUG tile_clicked solitaire2: tile=({tile.x},{tile.y},{tile.z}), tile_type={tile.tile_type}, is_available={is_available}, removed={tile.removed}")
+            logger.debug("tile_clicked solitaire2: tile=(%s,%s,%s), tile_type=%s, is_available=%s, removed=%s", tile.x, tile.y, tile.z, tile.tile_type, is_available, tile.removed)
             if not is_available or tile.removed:
-                print(f"DEBUG tile_clicked solitaire2: Тейл недоступний або вже видалений")
+                logger.debug("tile_clicked solitaire2: Тейл недоступний або вже видалений")
                 return
             
             # ВАЖЛИВО: Якщо обидві комірки зайняті, перевіряємо, чи натиснутий тейл відповідає одному з тейлів у комірках
@@ -4300,15 +4357,15 @@ def main(page: ft.Page):
                 # Обидві комірки зайняті - перевіряємо на відповідність
                 slot_tile = None
                 slot_index = None
-                print(f"DEBUG tile_clicked solitaire2: Обидві комірки зайняті, перевіряю на відповідність з тейлом на полі")
+                logger.debug("tile_clicked solitaire2: Обидві комірки зайняті, перевіряю на відповідність з тейлом на полі")
                 
                 # Перевіряємо на відповідність з тейлами в комірках
                 for i, slot_t in enumerate(solitaire2_slots[:2]):  # Тільки перші 2 комірки
                     if slot_t is not None:
                         is_match = slot_t.tile_type == tile.tile_type
-                        print(f"DEBUG tile_clicked solitaire2: Комірка {i}: tile_type={slot_t.tile_type}, порівняння з {tile.tile_type}: {is_match}")
+                        logger.debug("tile_clicked solitaire2: Комірка %s: tile_type=%s, порівняння з %s: %s", i, slot_t.tile_type, tile.tile_type, is_match)
                         if is_match:
-                            print(f"DEBUG tile_clicked solitaire2: ✓ Знайдено відповідний тейл у комірці {i} - видаляю обидва")
+                            logger.debug("tile_clicked solitaire2: ✓ Знайдено відповідний тейл у комірці %s - видаляю обидва", i)
                             slot_tile = slot_t
                             slot_index = i
                             break
@@ -4328,26 +4385,26 @@ def main(page: ft.Page):
             
             # Якщо комірки з парами не спрацювали, просто переміщуємо тейл у вільну комірку
             # Пріоритет: 0, потім 1, а якщо третя розблокована – 2
-            print(f"DEBUG tile_clicked solitaire2: Переміщую тейл у комірку. Перевіряю комірки: slot0={solitaire2_slots[0] is not None}, slot1={solitaire2_slots[1] is not None}, slot2={solitaire2_slots[2] is not None}, third_unlocked={solitaire2_third_slot_unlocked}")
+            logger.debug("tile_clicked solitaire2: Переміщую тейл у комірку. Перевіряю комірки: slot0=%s, slot1=%s, slot2=%s, third_unlocked=%s", solitaire2_slots[0] is not None, solitaire2_slots[1] is not None, solitaire2_slots[2] is not None, solitaire2_third_slot_unlocked)
             slot_index = None
             if solitaire2_slots[0] is None:
-                print("DEBUG tile_clicked solitaire2: Переміщую тейл у верхню комірку (0)")
+                logger.debug("tile_clicked solitaire2: Переміщую тейл у верхню комірку (0)")
                 slot_index = 0
                 solitaire2_slots[0] = tile
                 tile.removed = True  # Прибираємо з поля (не відображається на полі, але зберігається в комірці)
             elif solitaire2_slots[1] is None:
-                print("DEBUG tile_clicked solitaire2: Переміщую тейл у нижню комірку (1)")
+                logger.debug("tile_clicked solitaire2: Переміщую тейл у нижню комірку (1)")
                 slot_index = 1
                 solitaire2_slots[1] = tile
                 tile.removed = True  # Прибираємо з поля
             elif solitaire2_third_slot_unlocked and solitaire2_slots[2] is None:
-                print("DEBUG tile_clicked solitaire2: Переміщую тейл у третю комірку (2)")
+                logger.debug("tile_clicked solitaire2: Переміщую тейл у третю комірку (2)")
                 slot_index = 2
                 solitaire2_slots[2] = tile
                 tile.removed = True  # Прибираємо з поля
             else:
                 # Усі доступні комірки зайняті - не можна додати новий тейл
-                print("DEBUG tile_clicked solitaire2: Усі доступні комірки зайняті, але відповідності не знайдено")
+                logger.debug("tile_clicked solitaire2: Усі доступні комірки зайняті, але відповідності не знайдено")
                 return
             
             # Зберігаємо останній хід для можливості відміни (тільки один хід)
@@ -4365,24 +4422,24 @@ def main(page: ft.Page):
             
             # Перевіряємо, чи в обох комірках тейли однакові ТІЛЬКИ після того, як тейл поміщено в другу комірку
             # Якщо так - чекаємо 0.3 секунди перед видаленням
-            print(f"DEBUG tile_clicked solitaire2: Перевіряю на однаковість після поміщення тейла: slot0={solitaire2_slots[0] is not None}, slot1={solitaire2_slots[1] is not None}")
+            logger.debug("tile_clicked solitaire2: Перевіряю на однаковість після поміщення тейла: slot0=%s, slot1=%s", solitaire2_slots[0] is not None, solitaire2_slots[1] is not None)
             
             # Перевірка відбувається тільки якщо обидві комірки заповнені (тобто тейл щойно поміщено в другу комірку)
             if solitaire2_slots[0] is not None and solitaire2_slots[1] is not None:
-                print(f"DEBUG tile_clicked solitaire2: Обидві комірки заповнені, порівнюю типи: slot0.tile_type={solitaire2_slots[0].tile_type}, slot1.tile_type={solitaire2_slots[1].tile_type}")
-                print(f"DEBUG tile_clicked solitaire2: Порівняння: {solitaire2_slots[0].tile_type == solitaire2_slots[1].tile_type}")
+                logger.debug("tile_clicked solitaire2: Обидві комірки заповнені, порівнюю типи: slot0.tile_type=%s, slot1.tile_type=%s", solitaire2_slots[0].tile_type, solitaire2_slots[1].tile_type)
+                logger.debug("tile_clicked solitaire2: Порівняння: %s", solitaire2_slots[0].tile_type == solitaire2_slots[1].tile_type)
                 if solitaire2_slots[0].tile_type == solitaire2_slots[1].tile_type:
                     # Однакові тейли - ВАЖЛИВО: тейл вже в комірці, тепер чекаємо 0.3 секунди перед видаленням
                     solitaire2_pending_removal = True
-                    print(f"DEBUG tile_clicked solitaire2: Знайдено однакові тейли в комірках, чекаю 0.3 секунди перед видаленням")
+                    logger.debug("tile_clicked solitaire2: Знайдено однакові тейли в комірках, чекаю 0.3 секунди перед видаленням")
                     
                     # Функція для видалення однакових тейлів після затримки
                     def remove_matching_tiles():
                         nonlocal solitaire2_slots, solitaire2_last_move, solitaire2_pending_removal
-                        print(f"DEBUG remove_matching_tiles: Затримка 0.3 секунди завершена, перевіряю тейли перед видаленням")
+                        logger.debug("remove_matching_tiles: Затримка 0.3 секунди завершена, перевіряю тейли перед видаленням")
                         if solitaire2_pending_removal and solitaire2_slots[0] is not None and solitaire2_slots[1] is not None:
                             if solitaire2_slots[0].tile_type == solitaire2_slots[1].tile_type:
-                                print(f"DEBUG remove_matching_tiles: Видаляю однакові тейли")
+                                logger.debug("remove_matching_tiles: Видаляю однакові тейли")
                                 # Однакові тейли - видаляємо обидва
                                 solitaire2_pending_removal = False
                                 solitaire2_last_move = None
@@ -4400,21 +4457,21 @@ def main(page: ft.Page):
                                     check_game_state()
                                 page.run_task(update_ui)
                             else:
-                                print(f"DEBUG remove_matching_tiles: Тейли вже не однакові, не видаляю")
+                                logger.debug("remove_matching_tiles: Тейли вже не однакові, не видаляю")
                                 solitaire2_pending_removal = False
                         else:
-                            print(f"DEBUG remove_matching_tiles: Прапор не встановлений або одна з комірок порожня, не видаляю")
+                            logger.debug("remove_matching_tiles: Прапор не встановлений або одна з комірок порожня, не видаляю")
                             solitaire2_pending_removal = False
                     
                     # Запускаємо через threading.Timer (0.3 секунди) - затримка перед видаленням
                     # Тейл вже в комірці і відображається, тому затримка гарантує, що він буде видимий перед видаленням
                     timer = threading.Timer(0.3, remove_matching_tiles)
                     timer.start()
-                    print(f"DEBUG tile_clicked solitaire2: Запущено таймер на 0.3 секунди для видалення однакових тейлів")
+                    logger.debug("tile_clicked solitaire2: Запущено таймер на 0.3 секунди для видалення однакових тейлів")
                     return  # Виходимо, не викликаючи check_game_state зараз
             else:
                 # Якщо тільки одна комірка заповнена - просто виходимо
-                print(f"DEBUG tile_clicked solitaire2: Тільки одна комірка заповнена, перевірка на однаковість не потрібна")
+                logger.debug("tile_clicked solitaire2: Тільки одна комірка заповнена, перевірка на однаковість не потрібна")
             
             # Перевіряємо стан гри (включаючи перевірку на відсутність ходів)
             check_game_state()
@@ -4445,7 +4502,7 @@ def main(page: ft.Page):
         slot_index = solitaire2_last_move["slot_index"]
         
         # Перевіряємо, чи тейл все ще в комірці
-        if solitaire2_slots[slot_index] != tile:
+        if solitaire2_slots[slot_index] is not tile:
             # Тейл вже не в комірці (можливо, був видалений разом з іншим)
             solitaire2_last_move = None
             return
@@ -4510,7 +4567,9 @@ def main(page: ft.Page):
             nonlocal selected_solitaire1_pattern
             selected_solitaire1_pattern = solitaire1_pattern_dropdown.value
             # При зміні патерну одразу оновлюємо кращий час для нього
-            refresh_profile_stats()
+            mark_profile_stats_dirty()
+            flush_dirty_refreshes()
+            page.update()
         
         solitaire1_pattern_dropdown.on_change = on_pattern_selected
         
@@ -4624,7 +4683,9 @@ def main(page: ft.Page):
             nonlocal selected_solitaire2_pattern
             selected_solitaire2_pattern = solitaire2_pattern_dropdown.value
             # При зміні патерну одразу оновлюємо кращий час для нього
-            refresh_profile_stats()
+            mark_profile_stats_dirty()
+            flush_dirty_refreshes()
+            page.update()
         
         solitaire2_pattern_dropdown.on_change = on_pattern_selected
         
@@ -4664,7 +4725,7 @@ def main(page: ft.Page):
             elif selected_solitaire2_pattern:
                 pattern_name = selected_solitaire2_pattern
         
-        print(f"DEBUG start_solitaire2_mode: pattern_name={pattern_name}, dropdown.value={solitaire2_pattern_dropdown.value if solitaire2_pattern_dropdown else None}, selected_solitaire2_pattern={selected_solitaire2_pattern}")
+        logger.debug("start_solitaire2_mode: pattern_name=%s, dropdown.value=%s, selected_solitaire2_pattern=%s", pattern_name, solitaire2_pattern_dropdown.value if solitaire2_pattern_dropdown else None, selected_solitaire2_pattern)
         
         # Приховуємо кнопки режимів
         if solitaire2_button:
@@ -4684,7 +4745,7 @@ def main(page: ft.Page):
         board = Board(pattern_name=pattern_name)  # Створюємо нову дошку з game_mode="solitaire2" та вибраним патерном
         # Запам'ятовуємо патерн, з яким запущена гра
         current_pattern_name = pattern_name
-        print(f"DEBUG start_solitaire2_mode: Створено Board з pattern_name={pattern_name}, board.selected_pattern_name={board.selected_pattern_name}")
+        logger.debug("start_solitaire2_mode: Створено Board з pattern_name=%s, board.selected_pattern_name=%s", pattern_name, board.selected_pattern_name)
         # На початку будь-якої гри завжди 2 підказки і 1 тасування (базові)
         # Додаємо додаткові куплені підказки/тасування з бази даних
         hints_remaining = 2
@@ -4768,10 +4829,10 @@ def main(page: ft.Page):
         """Оновлює відображення дошки"""
         global game_mode
         nonlocal main_stack, sidebar_slots_area, tile_palette_container, solitaire2_last_move, darken_mode
-        print(f"DEBUG update_board: current_profile['id']={current_profile['id']}")
-        print(f"DEBUG update_board: start_button={start_button}, start_button.visible={start_button.visible if start_button else 'None'}")
-        print(f"DEBUG update_board: duel_button={duel_button}, duel_button.visible={duel_button.visible if duel_button else 'None'}")
-        print(f"DEBUG update_board: board.game_over={board.game_over if board else 'None'}")
+        logger.debug("update_board: current_profile['id']=%s", current_profile['id'])
+        logger.debug("update_board: start_button=%s, start_button.visible=%s", start_button, start_button.visible if start_button else 'None')
+        logger.debug("update_board: duel_button=%s, duel_button.visible=%s", duel_button, duel_button.visible if duel_button else 'None')
+        logger.debug("update_board: board.game_over=%s", board.game_over if board else 'None')
         board_container.controls.clear()
         # Очищаємо панель тейлів, якщо конструктор не активний
         if not pattern_constructor_mode:
@@ -4779,7 +4840,7 @@ def main(page: ft.Page):
         
         # Якщо користувач увійшов, але гра ще не почалася - показуємо кнопки режимів в верхньому лівому куті
         if current_profile["id"] is not None and start_button and start_button.visible:
-            print(f"DEBUG update_board: Показую рамочки з режимами")
+            logger.debug("update_board: Показую рамочки з режимами")
             # Заголовок для однокористувацького режиму
             single_player_title = ft.Container(
                 content=ft.Text(
@@ -4962,7 +5023,7 @@ def main(page: ft.Page):
                 
                 # Не перевіряємо межі board_container, бо комірки мають бути на фіксованій позиції відносно сайдбару
                 
-                print(f"DEBUG solitaire2_slots: slot_x={slot_x}, slot_y_start={slot_y_start}, max_x={max_x}, max_y={max_y}, offset_right={SOLITAIRE2_SLOTS_OFFSET_RIGHT}")
+                logger.debug("solitaire2_slots: slot_x=%s, slot_y_start=%s, max_x=%s, max_y=%s, offset_right=%s", slot_x, slot_y_start, max_x, max_y, SOLITAIRE2_SLOTS_OFFSET_RIGHT)
                 
                 # Створюємо три рамочки
                 for i in range(3):